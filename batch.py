@@ -0,0 +1,80 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+
+from main import DEFAULT_NUM_FOOD, DEFAULT_MOVE_INTERVAL
+from headless import make_game, run_headless, DEFAULT_TICK_DT
+
+DEFAULT_TICKS = 1000
+
+# Every result row has these columns, in this order, in the output file
+CONFIG_FIELDS = ("snakes", "food", "speed", "death", "seed", "engine", "ticks", "dt")
+RESULT_FIELDS = ("survivors", "total_length", "max_length", "collisions", "ticks_per_sec", "elapsed", "checksum")
+
+def config_grid(snake_counts=(100,), food_counts=(DEFAULT_NUM_FOOD,), speeds=(DEFAULT_MOVE_INTERVAL,),
+                deaths=(True,), seeds=(0,), engine="objects", ticks=DEFAULT_TICKS, dt=DEFAULT_TICK_DT):
+    # One configuration per combination of settings and seed
+    return [
+        {"snakes": snakes, "food": food, "speed": speed, "death": death, "seed": seed,
+         "engine": engine, "ticks": ticks, "dt": dt}
+        for snakes, food, speed, death, seed
+        in itertools.product(snake_counts, food_counts, speeds, deaths, seeds)
+    ]
+
+def run_config(config):
+    # Worker entry point: play one headless game and return its config and outcome
+    game = make_game(config["snakes"], config["food"], config["speed"], config["death"],
+                     config["engine"], config["seed"])
+    result = dict(config)
+    outcome = run_headless(game, config["ticks"], config["dt"])
+    result.update((field, outcome[field]) for field in RESULT_FIELDS)
+    return result
+
+def run_batch(configs, workers=None):
+    # Yields each result as soon as its game finishes, in completion order
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for job in as_completed([pool.submit(run_config, config) for config in configs]):
+            yield job.result()
+
+def write_columns(results, path):
+    # One compressed array per field; rows are in completion order
+    columns = {}
+    for field in CONFIG_FIELDS + RESULT_FIELDS:
+        values = [result[field] for result in results]
+        columns[field] = np.array(values, dtype=np.uint32 if field == "checksum" else None)
+    np.savez_compressed(path, **columns)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a grid of headless games in parallel")
+    parser.add_argument("--snakes", type=int, nargs="+", default=[100])
+    parser.add_argument("--food", type=int, nargs="+", default=[DEFAULT_NUM_FOOD])
+    parser.add_argument("--speed", type=float, nargs="+", default=[DEFAULT_MOVE_INTERVAL],
+                        help="milliseconds between moves")
+    parser.add_argument("--death", choices=("on", "off"), nargs="+", default=["on"])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--engine", choices=("objects", "arrays"), default="objects")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS)
+    parser.add_argument("--dt", type=float, default=DEFAULT_TICK_DT, help="milliseconds per tick")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--output", default="batch.npz", help="columnar results file (.npz)")
+    args = parser.parse_args()
+
+    configs = config_grid(args.snakes, args.food, args.speed, [d == "on" for d in args.death],
+                          args.seeds, args.engine, args.ticks, args.dt)
+    results = []
+    for i, result in enumerate(run_batch(configs, args.workers), 1):
+        results.append(result)
+        # Stream each finished game as a JSON line
+        print(json.dumps(result), flush=True)
+        print(f"{i}/{len(configs)} done", file=sys.stderr)
+    write_columns(results, args.output)
+
+if __name__ == '__main__':
+    main()
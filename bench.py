@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Draw through SDL's dummy driver so benchmarks also run on machines without a display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from main import Snake, GRID_SIZE
+from headless import make_game, run_headless, DEFAULT_TICK_DT
+
+# Sweep defaults span the menu slider ranges
+DEFAULT_SNAKE_COUNTS = [10, 100, 500]
+DEFAULT_FOOD_COUNTS = [5, 50, 1000]
+DEFAULT_BODY_LENGTHS = [1, 50]
+DEFAULT_TICKS = 200
+DEFAULT_SEED = 0
+
+# Snake methods timed on every call during the phase pass
+SNAKE_PHASES = ("wake", "decide_direction", "is_safe")
+
+class PhaseTimer:
+    # Accumulates wall time and call counts per named phase
+    def __init__(self):
+        self.totals = {}
+        self.calls = {}
+
+    def wrap(self, name, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+                self.calls[name] = self.calls.get(name, 0) + 1
+        return timed
+
+    def report(self, ticks):
+        return {name: {"total": total, "per_tick": total / ticks, "calls": self.calls[name]}
+                for name, total in self.totals.items()}
+
+@contextmanager
+def timed_snake_methods(timer):
+    # Patch the timers in at class level and always put the originals back
+    originals = {name: getattr(Snake, name) for name in SNAKE_PHASES}
+    try:
+        for name, func in originals.items():
+            setattr(Snake, name, timer.wrap(name, func))
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(Snake, name, func)
+
+def set_body_lengths(game, length):
+    # Stretch every snake to the given length, trailing straight back from its head
+    for snake in game.snakes:
+        game.occupancy.remove_body(snake.cells)
+        head = snake.position
+        snake.body = [head - snake.direction * (GRID_SIZE * i) for i in range(length)]
+        game.occupancy.add_body(snake.cells)
+
+def bench_config(num_snakes, num_food, body_length, ticks, dt, seed, draw):
+    def setup(headless=True):
+        # Only the phase run draws. A windowed game queues every changed cell for
+        # the renderer until draw_game runs, so the other runs stay headless
+        game = make_game(num_snakes, num_food, seed=seed, headless=headless)
+        set_body_lengths(game, body_length)
+        return game
+
+    # Plain run for throughput, free of any timing overhead
+    result = {"snakes": num_snakes, "food": num_food, "body_length": body_length}
+    result.update(run_headless(setup(), ticks, dt))
+
+    # Instrumented run for per-phase times; timers nest, so snake phases are inclusive
+    game = setup(headless=not draw)
+    timer = PhaseTimer()
+    for name in ("update_game", "resize_food", "move_snakes", "consume_food"):
+        setattr(game, name, timer.wrap(name, getattr(game, name)))
+    draw_game = timer.wrap("draw_game", game.draw_game)
+    with timed_snake_methods(timer):
+        for _ in range(ticks):
+            game.update_game(dt)
+            if draw:
+                draw_game()
+    result["phases"] = timer.report(ticks)
+
+    # Separate run under tracemalloc, which would skew the timings above
+    tracemalloc.start()
+    try:
+        game = setup()
+        for _ in range(ticks):
+            game.update_game(dt)
+        # Live memory at the end is mostly snake bodies and the lookup grids; the
+        # peak also covers transient allocations during setup
+        result["memory_bytes"], result["peak_memory_bytes"] = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result
+
+def run_benchmarks(snake_counts=DEFAULT_SNAKE_COUNTS, food_counts=DEFAULT_FOOD_COUNTS,
+                   body_lengths=DEFAULT_BODY_LENGTHS, ticks=DEFAULT_TICKS, dt=DEFAULT_TICK_DT,
+                   seed=DEFAULT_SEED, draw=True, log=None):
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "ticks": ticks,
+            "dt": dt,
+            "seed": seed,
+            "draw": draw,
+        },
+        "results": [],
+    }
+    for num_snakes in snake_counts:
+        for num_food in food_counts:
+            for body_length in body_lengths:
+                result = bench_config(num_snakes, num_food, body_length, ticks, dt, seed, draw)
+                report["results"].append(result)
+                if log:
+                    log(f"snakes={num_snakes} food={num_food} length={body_length}: "
+                        f"{result['ticks_per_sec']:.1f} ticks/s")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths")
+    parser.add_argument("--snakes", type=int, nargs="+", default=DEFAULT_SNAKE_COUNTS)
+    parser.add_argument("--food", type=int, nargs="+", default=DEFAULT_FOOD_COUNTS)
+    parser.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_BODY_LENGTHS,
+                        help="starting body length of every snake")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS)
+    parser.add_argument("--dt", type=float, default=DEFAULT_TICK_DT, help="milliseconds per tick")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--no-draw", action="store_true", help="skip timing draw_game")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.snakes, args.food, args.lengths, args.ticks, args.dt,
+                            args.seed, not args.no_draw, log=lambda line: print(line, file=sys.stderr))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+import zlib
+
+import numpy as np
+import pygame
+
+from main import (BOARD_WIDTH, BOARD_HEIGHT, GRID_SIZE, DEFAULT_NUM_FOOD,
+                  DEFAULT_MOVE_INTERVAL, STUN_DURATION)
+
+# Direction table shared by every snake, indexed by the per-snake direction code
+RIGHT, LEFT, DOWN, UP = 0, 1, 2, 3
+DIRECTIONS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.int64)
+
+INITIAL_CAPACITY = 16     # Ring buffer slots per snake; doubled whenever a snake outgrows it
+NEAREST_FOOD_CHUNK = 256  # Snakes per block of the snake x food distance matrix
+
+def nearest_food(hx, hy, food_cells, cols):
+    # Coordinates of the closest food to each head
+    fx = food_cells % cols
+    fy = food_cells // cols
+    nearest = np.empty(len(hx), dtype=np.int64)
+    for start in range(0, len(hx), NEAREST_FOOD_CHUNK):
+        stop = start + NEAREST_FOOD_CHUNK
+        dx = fx[None, :] - hx[start:stop, None]
+        dy = fy[None, :] - hy[start:stop, None]
+        # argmin keeps the first of equal distances, like min() over Game.foods
+        nearest[start:stop] = np.argmin(dx * dx + dy * dy, axis=1)
+    return fx[nearest], fy[nearest]
+
+def safe_directions(hx, hy, tails, occupancy, cols, rows):
+    # (n, 4) mask of directions that stay on the board and don't run into a
+    # snake, ignoring the snake's own tail which moves out of the way
+    safe = np.zeros((len(hx), 4), dtype=bool)
+    for d, (ddx, ddy) in enumerate(DIRECTIONS):
+        x = hx + ddx
+        y = hy + ddy
+        inside = (x >= 0) & (x < cols) & (y >= 0) & (y < rows)
+        cand = np.where(inside, y * cols + x, 0)
+        taken = occupancy[cand].astype(np.int64) - (cand == tails)
+        safe[:, d] = inside & (taken == 0)
+    return safe
+
+def steer(heads, tails, current, food_cells, occupancy, cols, rows, weights):
+    # New direction codes for snakes with the given head and tail cells. Depends
+    # only on its arguments, so any subset of snakes can be steered anywhere;
+    # weights are uniform randoms (n, 4) that pick among safe fallback moves
+    hx = heads % cols
+    hy = heads // cols
+    fx, fy = nearest_food(hx, hy, food_cells, cols)
+    dx = fx - hx
+    dy = fy - hy
+
+    # Preferred direction closes the larger gap, alternate the other one
+    horizontal = np.abs(dx) > np.abs(dy)
+    preferred = np.where(horizontal, np.where(dx > 0, RIGHT, LEFT),
+                         np.where(dy > 0, DOWN, np.where(dy < 0, UP, current)))
+    alternate = np.where(horizontal, np.where(dy < 0, UP, DOWN),
+                         np.where(dx < 0, LEFT, RIGHT))
+
+    safe = safe_directions(hx, hy, tails, occupancy, cols, rows)
+    n = np.arange(len(heads))
+
+    # Keep going if the current direction is safe and gets closer to the food
+    nx = hx + DIRECTIONS[current, 0]
+    ny = hy + DIRECTIONS[current, 1]
+    closer = (fx - nx) ** 2 + (fy - ny) ** 2 < dx * dx + dy * dy
+    keep = safe[n, current] & closer
+
+    # Otherwise pick uniformly among whatever is still safe
+    weights = np.where(safe, weights, -1.0)
+    fallback = np.where(safe.any(axis=1), np.argmax(weights, axis=1), current)
+
+    return np.where(keep, current,
+                    np.where(safe[n, preferred], preferred,
+                             np.where(safe[n, alternate], alternate, fallback)))
+
+class ArrayEngine:
+    # Struct-of-arrays version of Game's simulation for runs with thousands of snakes.
+    # Every per-snake field is a NumPy array and bodies live in preallocated ring
+    # buffers of packed cells (y * cols + x). The head walks backwards through the
+    # ring, so adding a head and popping a tail are both O(1), and each tick moves
+    # all due snakes in one vectorized step.
+    #
+    # Rules match Snake/Game (nearest-food steering, stun on collision, death on the
+    # third strike when enabled, growing one segment per food) with two differences
+    # that come from resolving a tick all at once:
+    #   - all snakes see the board as it was at the start of the tick, so a snake
+    #     can't follow into a cell another snake's tail leaves in the same tick, and
+    #     when several snakes step into the same cell the lowest index gets it
+    #   - the board edge is a wall; stepping off it stuns like hitting a snake
+    def __init__(self, num_snakes, num_food=DEFAULT_NUM_FOOD, game_speed=DEFAULT_MOVE_INTERVAL,
+                 death_enabled=True, seed=None):
+        self.cols = BOARD_WIDTH // GRID_SIZE
+        self.rows = BOARD_HEIGHT // GRID_SIZE
+        # All randomness comes from this generator, so a seed reproduces a run
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.game_speed = game_speed
+        self.food_count = num_food
+        self.death_enabled = death_enabled
+
+        n = num_snakes
+        self.capacity = INITIAL_CAPACITY
+        self.cells = np.zeros((n, self.capacity), dtype=np.int64)
+        self.head = np.zeros(n, dtype=np.int64)
+        self.length = np.ones(n, dtype=np.int64)
+        self.grow_segments = np.zeros(n, dtype=np.int64)
+        self.direction = np.full(n, RIGHT, dtype=np.int64)
+        self.collision_count = np.zeros(n, dtype=np.int64)
+        self.stunned = np.zeros(n, dtype=bool)
+        self.stun_timer = np.zeros(n, dtype=np.float64)
+        self.move_timer = np.full(n, float(DEFAULT_MOVE_INTERVAL))
+        self.alive = np.ones(n, dtype=bool)
+
+        self.cells[:, 0] = self._random_cells(n)
+        self.occupancy = np.zeros(self.cols * self.rows, dtype=np.uint16)
+        np.add.at(self.occupancy, self.cells[:, 0], 1)
+
+        self.food_cells = self._random_cells(num_food)
+
+    def _random_cells(self, count):
+        x = self.rng.integers(0, self.cols, size=count)
+        y = self.rng.integers(0, self.rows, size=count)
+        return y * self.cols + x
+
+    # --- Queries -----------------------------------------------------------
+
+    @property
+    def num_alive(self):
+        return int(self.alive.sum())
+
+    def positions(self):
+        # World positions of every living snake's head as an (n, 2) array
+        idx = np.flatnonzero(self.alive)
+        heads = self.cells[idx, self.head[idx]]
+        return np.stack((heads % self.cols, heads // self.cols), axis=1) * GRID_SIZE
+
+    def body(self, i):
+        # Segments of snake i, head first, in the same form as Snake.body
+        slots = (self.head[i] + np.arange(self.length[i])) % self.capacity
+        return [pygame.Vector2(int(c % self.cols) * GRID_SIZE, int(c // self.cols) * GRID_SIZE)
+                for c in self.cells[i, slots]]
+
+    def checksum(self):
+        # CRC of the simulation state, independent of ring layout and capacity
+        idx = np.flatnonzero(self.alive)
+        slots = (self.head[idx, None] + np.arange(self.capacity)[None, :]) % self.capacity
+        bodies = np.take_along_axis(self.cells[idx], slots, axis=1)
+        bodies = bodies[np.arange(self.capacity)[None, :] < self.length[idx, None]]
+        crc = 0
+        for part in (idx, self.length[idx], bodies, self.direction[idx], self.grow_segments[idx],
+                     self.collision_count[idx], self.stunned[idx], self.stun_timer[idx],
+                     self.move_timer[idx], self.food_cells):
+            crc = zlib.crc32(np.ascontiguousarray(part).tobytes(), crc)
+        return crc
+
+    def _valid_slots(self, idx):
+        # Mask of ring slots that hold a body segment for the given snakes
+        offset = (np.arange(self.capacity)[None, :] - self.head[idx, None]) % self.capacity
+        return offset < self.length[idx, None]
+
+    # --- Simulation --------------------------------------------------------
+
+    def update_game(self, dt):
+        self._resize_food(self.food_count)
+
+        # Stunned snakes only count down; they can move again from the next frame
+        active = np.flatnonzero(self.alive & ~self.stunned)
+        stunned = np.flatnonzero(self.alive & self.stunned)
+        self.stun_timer[stunned] -= dt
+        self.stunned[stunned[self.stun_timer[stunned] <= 0]] = False
+
+        self.move_timer[active] -= dt
+        due = active[self.move_timer[active] <= 0]
+        self.move_timer[due] = self.game_speed
+        if len(due):
+            self._decide_directions(due)
+            self._move(due)
+
+        self._eat_food()
+
+    def _resize_food(self, count):
+        if len(self.food_cells) < count:
+            extra = self._random_cells(count - len(self.food_cells))
+            self.food_cells = np.concatenate((self.food_cells, extra))
+        elif len(self.food_cells) > count:
+            self.food_cells = self.food_cells[:count]
+
+    def _decide_directions(self, idx):
+        if not len(self.food_cells):
+            return
+        heads = self.cells[idx, self.head[idx]]
+        tails = self.cells[idx, (self.head[idx] + self.length[idx] - 1) % self.capacity]
+        weights = self.rng.random((len(idx), 4))
+        self.direction[idx] = steer(heads, tails, self.direction[idx], self.food_cells,
+                                    self.occupancy, self.cols, self.rows, weights)
+
+    def _move(self, idx):
+        heads = self.cells[idx, self.head[idx]]
+        x = heads % self.cols + DIRECTIONS[self.direction[idx], 0]
+        y = heads // self.cols + DIRECTIONS[self.direction[idx], 1]
+        inside = (x >= 0) & (x < self.cols) & (y >= 0) & (y < self.rows)
+        new_heads = np.where(inside, y * self.cols + x, 0)
+
+        # A move collides when another snake holds the cell; own segments don't count
+        blocked = ~inside
+        occupied = np.flatnonzero(inside & (self.occupancy[new_heads] > 0))
+        if len(occupied):
+            sub = idx[occupied]
+            own = ((self.cells[sub] == new_heads[occupied, None]) & self._valid_slots(sub)).sum(axis=1)
+            blocked[occupied] = self.occupancy[new_heads[occupied]] > own
+
+        # Snakes stepping into the same free cell: the lowest index gets it
+        free = np.flatnonzero(~blocked)
+        _, first = np.unique(new_heads[free], return_index=True)
+        contested = np.ones(len(free), dtype=bool)
+        contested[first] = False
+        blocked[free[contested]] = True
+
+        self._collide(idx[blocked])
+
+        movers = idx[~blocked]
+        new_heads = new_heads[~blocked]
+        growing = self.grow_segments[movers] > 0
+        if (self.length[movers[growing]] >= self.capacity).any():
+            self._grow_capacity()
+
+        # Pop tails of snakes that aren't growing, then push the new heads
+        popping = movers[~growing]
+        tails = self.cells[popping, (self.head[popping] + self.length[popping] - 1) % self.capacity]
+        np.subtract.at(self.occupancy, tails, 1)
+        self.head[movers] = (self.head[movers] - 1) % self.capacity
+        self.cells[movers, self.head[movers]] = new_heads
+        self.occupancy[new_heads] += 1
+        self.length[movers[growing]] += 1
+        self.grow_segments[movers[growing]] -= 1
+
+    def _collide(self, idx):
+        self.stunned[idx] = True
+        self.stun_timer[idx] = STUN_DURATION
+        self.collision_count[idx] += 1
+        if self.death_enabled:
+            dying = idx[self.collision_count[idx] >= 3]
+            if len(dying):
+                self.alive[dying] = False
+                np.subtract.at(self.occupancy, self.cells[dying][self._valid_slots(dying)], 1)
+
+    def _grow_capacity(self):
+        # Unroll every ring so the head sits at slot 0, then double the buffers
+        capacity = self.capacity * 2
+        slots = (self.head[:, None] + np.arange(self.capacity)[None, :]) % self.capacity
+        cells = np.zeros((len(self.cells), capacity), dtype=np.int64)
+        cells[:, :self.capacity] = np.take_along_axis(self.cells, slots, axis=1)
+        self.cells = cells
+        self.head[:] = 0
+        self.capacity = capacity
+
+    def _eat_food(self):
+        if not len(self.food_cells):
+            return
+        living = np.flatnonzero(self.alive)
+        heads = self.cells[living, self.head[living]]
+        order = np.argsort(heads, kind='stable')
+        sorted_heads = heads[order]
+        pos = np.searchsorted(sorted_heads, self.food_cells)
+        hit = pos < len(sorted_heads)
+        hit[hit] = sorted_heads[pos[hit]] == self.food_cells[hit]
+        if not hit.any():
+            return
+        # A stable sort puts the lowest snake index first among heads on the same cell
+        np.add.at(self.grow_segments, living[order[pos[hit]]], 1)
+        self.food_cells[hit] = self._random_cells(int(hit.sum()))
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import time
+
+# Keep stdout clean for the JSON results
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from main import Game, DEFAULT_NUM_FOOD, DEFAULT_MOVE_INTERVAL
+
+# Default simulation step; one tick per move keeps every snake busy every update
+DEFAULT_TICK_DT = DEFAULT_MOVE_INTERVAL
+
+def parse_tiles(text):
+    # argparse type for --tiles: columns x rows, both positive
+    cols, sep, rows = text.partition("x")
+    if not (sep and cols.isdigit() and rows.isdigit() and int(cols) > 0 and int(rows) > 0):
+        raise argparse.ArgumentTypeError(f"expected COLSxROWS with positive counts, e.g. 2x2, got {text!r}")
+    return int(cols), int(rows)
+
+def make_game(num_snakes, num_food=DEFAULT_NUM_FOOD, speed=DEFAULT_MOVE_INTERVAL,
+              death_enabled=True, engine="objects", seed=None, headless=True, tiles=None,
+              recorder=None, smart=False, parallel_min=None):
+    # Build a started game, by default without a display. "objects" is the
+    # regular Game, "arrays" is the NumPy engine from engine.py and "tiled" is
+    # that engine spread over a process pool by board tile (see parallel.py;
+    # call close() on it when done). A recorder (replay.ReplayWriter) records
+    # the regular Game from its first tick. Smart snakes (PathPlanner) are only
+    # in the regular Game
+    if engine == "arrays":
+        from engine import ArrayEngine
+        return ArrayEngine(num_snakes, num_food, game_speed=speed, death_enabled=death_enabled, seed=seed)
+    if engine == "tiled":
+        from parallel import TiledEngine, DEFAULT_TILES, PARALLEL_MIN_SNAKES
+        return TiledEngine(num_snakes, num_food, game_speed=speed, death_enabled=death_enabled, seed=seed,
+                           tiles=tiles or DEFAULT_TILES,
+                           min_snakes=PARALLEL_MIN_SNAKES if parallel_min is None else parallel_min)
+    game = Game(headless=headless, seed=seed)
+    # Settings go through the same widgets the menu uses
+    game.num_snakes_slider.value = num_snakes
+    game.food_slider.value = num_food
+    game.speed_slider.value = speed
+    game.death_checkbox.checked = death_enabled
+    game.smart_checkbox.checked = smart
+    game.recorder = recorder
+    game.start_game()
+    return game
+
+def game_stats(game):
+    # Survivors, lengths and collisions for either engine
+    if hasattr(game, "alive"):
+        alive = game.alive
+        return {
+            "survivors": int(alive.sum()),
+            "total_length": int(game.length[alive].sum()),
+            "max_length": int(game.length[alive].max(initial=0)),
+            "collisions": int(game.collision_count.sum()),
+        }
+    return {
+        "survivors": len(game.snakes),
+        "total_length": sum(len(s.cells) for s in game.snakes),
+        "max_length": max((len(s.cells) for s in game.snakes), default=0),
+        "collisions": sum(s.collision_count for s in game.snakes),
+    }
+
+def run_headless(game, ticks, dt=DEFAULT_TICK_DT, checksums=False):
+    # Step the simulation on a fixed dt as fast as it will go. With checksums the
+    # state CRC after every tick is recorded (and timed along with the ticks)
+    tick_checksums = []
+    start = time.perf_counter()
+    for _ in range(ticks):
+        game.update_game(dt)
+        if checksums:
+            tick_checksums.append(game.checksum())
+    elapsed = time.perf_counter() - start
+    result = {
+        "seed": game.seed,
+        "ticks": ticks,
+        "dt": dt,
+        "elapsed": elapsed,
+        "ticks_per_sec": ticks / elapsed if elapsed > 0 else float("inf"),
+        "checksum": game.checksum(),
+    }
+    result.update(game_stats(game))
+    if checksums:
+        result["checksums"] = tick_checksums
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the snake simulation without a window")
+    parser.add_argument("--snakes", type=int, default=100, help="number of snakes")
+    parser.add_argument("--food", type=int, default=DEFAULT_NUM_FOOD, help="number of food items")
+    parser.add_argument("--ticks", type=int, default=1000, help="number of simulation steps")
+    parser.add_argument("--dt", type=float, default=DEFAULT_TICK_DT, help="milliseconds per step")
+    parser.add_argument("--speed", type=float, default=DEFAULT_MOVE_INTERVAL, help="milliseconds between moves")
+    parser.add_argument("--no-death", action="store_true", help="disable snake death")
+    parser.add_argument("--smart", action="store_true", help="steer snakes by path search (objects engine)")
+    parser.add_argument("--engine", choices=("objects", "arrays", "tiled"), default="objects")
+    parser.add_argument("--tiles", type=parse_tiles, default=None, help="tiled engine board split, e.g. 2x2")
+    parser.add_argument("--parallel-min", type=int, default=None,
+                        help="tiled engine: fewest moving snakes in a tick worth sending to the pool")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible run")
+    parser.add_argument("--checksums", action="store_true", help="record a state checksum after every tick")
+    parser.add_argument("--record", default=None, help="write a replay of the run here (objects engine)")
+    args = parser.parse_args()
+    if args.record and args.engine != "objects":
+        parser.error("--record needs the objects engine")
+    if args.smart and args.engine != "objects":
+        parser.error("--smart needs the objects engine")
+
+    recorder = None
+    if args.record:
+        from replay import ReplayWriter
+        recorder = ReplayWriter(args.record)
+    game = make_game(args.snakes, args.food, args.speed, not args.no_death, args.engine, args.seed, tiles=args.tiles,
+                     recorder=recorder, smart=args.smart, parallel_min=args.parallel_min)
+    try:
+        print(json.dumps(run_headless(game, args.ticks, args.dt, args.checksums)))
+    finally:
+        if recorder:
+            recorder.close()
+        if hasattr(game, "close"):
+            game.close()
+
+if __name__ == '__main__':
+    main()
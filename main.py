@@ -1,9 +1,19 @@
 #deprecated
 
+import argparse
 import pygame
 import random
 import math
 import sys
+import csv
+import json
+import time
+import zlib
+import heapq
+import struct
+from array import array
+from collections import deque
+from contextlib import contextmanager
 
 # Initialize pygame
 pygame.init()
@@ -15,11 +25,31 @@ GRID_SIZE = 1
 DEFAULT_NUM_FOOD = 50
 DEFAULT_MOVE_INTERVAL = 100      # milliseconds between moves (faster game speed)
 STUN_DURATION = 2000             # milliseconds stunned
+FOOD_BUCKET_SIZE = 64            # cells per side of a nearest-food lookup bucket
+MAX_FPS = 244                    # frame cap
+MAX_TIME_SCALE = 64              # fastest fast-forward, in game milliseconds per real millisecond
+SIM_BUDGET_MS = 50               # real time a frame may spend catching the simulation up
+MAX_SIM_BACKLOG = 5000           # game milliseconds of catch-up kept before dropping the rest
+MOVE_CLOCK_EPSILON = 1e-9        # slack for rounding in the accumulated move clock
+PATH_BUDGET = 10000              # board cells smart snakes may search per tick, all together
+PATH_SEARCH_LIMIT = 4096         # board cells one smart snake may search per decision
+PROFILE_WINDOW = 120             # frames averaged in the profiler overlay
+PROFILE_DUMP_PATH = "profile.csv"  # where profiler frames are written on exit (.csv or .json)
+SNAPSHOT_MAGIC = b"SNKS"
+SNAPSHOT_VERSION = 3
 
 # Screen settings (display entire board)
 SCREEN_WIDTH = 1920
 SCREEN_HEIGHT = 1080
 
+# Game.snapshot() layout: this header, then the random generator's state and
+# flat arrays of snake fields, body segments (packed cells), food cells, fresh
+# food cells and smart snakes' cached paths (see Game.snapshot for their
+# order), all in native byte order
+SNAPSHOT_HEADER = struct.Struct("=4sH?qIIIIIddddddd???d")
+SNAPSHOT_SNAKE_INTS = 7   # body length, direction x, direction y, collisions, grow segments, stunned, path length
+SNAPSHOT_SNAKE_TIMES = 2  # next_move, stun_end
+
 # Colors
 GREEN = (0, 255, 0)
 RED = (255, 0, 0)
@@ -37,10 +67,70 @@ BUTTON_BORDER_COLOR = (189, 147, 249)  # Bright purple
 BUTTON_TEXT_COLOR = (248, 248, 242)  # Almost white
 UI_PANEL_BG = (50, 50, 50, 200)  # Semi-transparent background matching original
 
+# Snake bodies and the occupancy grid address board cells by one packed int,
+# y << CELL_BITS | (x + CELL_OFFSET). Moving one cell is adding a constant, and
+# x stays valid for boxed-in snakes pushed up to CELL_OFFSET cells off the board
+CELL_BITS = 16
+CELL_OFFSET = 1 << (CELL_BITS - 1)
+CELL_MASK = (1 << CELL_BITS) - 1
+
+def pack_cell(x, y):
+    return (y << CELL_BITS) | (x + CELL_OFFSET)
+
+def unpack_cell(cell):
+    return (cell & CELL_MASK) - CELL_OFFSET, cell >> CELL_BITS
+
+def pack_position(pos):
+    return pack_cell(int(pos[0]) // GRID_SIZE, int(pos[1]) // GRID_SIZE)
+
+def cell_position(cell):
+    x, y = unpack_cell(cell)
+    return pygame.Vector2(x * GRID_SIZE, y * GRID_SIZE)
+
+def cell_step(direction):
+    # Packed-cell offset of one move in a direction vector
+    return (int(direction.y) << CELL_BITS) + int(direction.x)
+
 # Utility function for sign
 def sign(x):
     return (1 if x > 0 else -1 if x < 0 else 0)
 
+def read_array(data, offset, typecode, count):
+    # count items of an array packed into data at offset; returns them and the offset after
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    values.frombytes(data[offset:end])
+    return values, end
+
+class SurfaceCache:
+    # Pre-rendered text and panel surfaces. Each slot (a widget's label, a panel
+    # shape) keeps the surface for what it last showed and is only rebuilt when
+    # that changes, so steady frames reuse everything
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, slot, key, build):
+        entry = self.entries.get(slot)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        surface = build()
+        self.entries[slot] = (key, surface)
+        return surface
+
+    def text(self, slot, font, text, color):
+        return self.get(slot, (font, text, color), lambda: font.render(text, True, color))
+
+    def panel(self, size, color, border_radius):
+        def build():
+            panel_surface = pygame.Surface(size, pygame.SRCALPHA)
+            pygame.draw.rect(panel_surface, color, panel_surface.get_rect(), border_radius=border_radius)
+            return panel_surface
+        return self.get(("panel", size, color, border_radius), None, build)
+
 class Slider:
     def __init__(self, pos, width, height, min_value, max_value, initial_value, label):
         self.rect = pygame.Rect(pos[0], pos[1], width, height)
@@ -72,12 +162,10 @@ class Slider:
                 return True
         return False
 
-    def draw(self, surface, font):
+    def draw(self, surface, font, cache):
         # Draw background panel for the entire slider area
         panel_rect = pygame.Rect(self.rect.x - 5, self.rect.y - 25, self.rect.width + 10, self.rect.height + 30)
-        panel_surface = pygame.Surface((panel_rect.width, panel_rect.height), pygame.SRCALPHA)
-        pygame.draw.rect(panel_surface, UI_PANEL_BG, panel_surface.get_rect(), border_radius=5)
-        surface.blit(panel_surface, panel_rect)
+        surface.blit(cache.panel(panel_rect.size, UI_PANEL_BG, 5), panel_rect)
 
         # Draw slider track with rounded corners
         pygame.draw.rect(surface, SLIDER_TRACK_COLOR, self.rect, border_radius=5)
@@ -98,7 +186,7 @@ class Slider:
         pygame.draw.circle(surface, SLIDER_BORDER_COLOR, handle_center, self.handle_radius, 2)
         
         # Draw label text above slider
-        label_surf = font.render(f"{self.label}: {self.value:.1f}", True, SLIDER_TEXT_COLOR)
+        label_surf = cache.text((self, "label"), font, f"{self.label}: {self.value:.1f}", SLIDER_TEXT_COLOR)
         surface.blit(label_surf, (self.rect.x, self.rect.y - 20))
 
 class Checkbox:
@@ -114,7 +202,7 @@ class Checkbox:
                 return True
         return False
 
-    def draw(self, surface, font):
+    def draw(self, surface, font, cache):
         # Draw checkbox background
         pygame.draw.rect(surface, CHECKBOX_BG_COLOR, self.rect)
         # Draw border
@@ -124,7 +212,7 @@ class Checkbox:
             inner_rect = self.rect.inflate(-4, -4)
             pygame.draw.rect(surface, CHECKBOX_FILL_COLOR, inner_rect)
         # Draw label to the right of checkbox
-        label_surf = font.render(self.label, True, SLIDER_TEXT_COLOR)
+        label_surf = cache.text((self, "label"), font, self.label, SLIDER_TEXT_COLOR)
         surface.blit(label_surf, (self.rect.right + 10, self.rect.y))
 
 class Button:
@@ -133,94 +221,271 @@ class Button:
         self.text = text
         self.hovered = False
 
-    def draw(self, surface, font):
+    def draw(self, surface, font, cache):
         # Draw button background with rounded corners
         pygame.draw.rect(surface, BUTTON_BG_COLOR, self.rect, border_radius=10)
         pygame.draw.rect(surface, BUTTON_BORDER_COLOR, self.rect, 2, border_radius=10)
         
         # Draw text centered on button
-        text_surf = font.render(self.text, True, BUTTON_TEXT_COLOR)
+        text_surf = cache.text((self, "text"), font, self.text, BUTTON_TEXT_COLOR)
         text_rect = text_surf.get_rect(center=self.rect.center)
         surface.blit(text_surf, text_rect)
 
     def is_clicked(self, mouse_pos):
         return self.rect.collidepoint(mouse_pos)
 
+class OccupancyGrid:
+    # Number of snake segments on every board cell, kept in sync as snakes move
+    # so collision and safety checks are a single lookup instead of body scans.
+    # Cells are packed (see pack_cell)
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = array('H', bytes(2 * width * height))
+        self.outside = {}  # Snakes can leave the board when boxed in; count those cells here
+        self.lookups = 0   # Collision/safety queries answered, read by the profiler
+        self.changes = None  # When set (a DirtyCells), cells that became empty or occupied are marked
+
+    def clear(self):
+        self.cells = array('H', bytes(2 * self.width * self.height))
+        self.outside.clear()
+
+    def index(self, cell):
+        # Position in self.cells, or -1 off the board
+        x = (cell & CELL_MASK) - CELL_OFFSET
+        y = cell >> CELL_BITS
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return -1
+
+    def count(self, cell):
+        self.lookups += 1
+        i = self.index(cell)
+        if i < 0:
+            return self.outside.get(cell, 0)
+        return self.cells[i]
+
+    def add(self, cell):
+        i = self.index(cell)
+        if i < 0:
+            self.outside[cell] = self.outside.get(cell, 0) + 1
+        else:
+            self.cells[i] += 1
+            if self.changes is not None and self.cells[i] == 1:
+                self.changes.mark(((i % self.width) * GRID_SIZE, (i // self.width) * GRID_SIZE))
+
+    def remove(self, cell):
+        i = self.index(cell)
+        if i < 0:
+            if self.outside[cell] > 1:
+                self.outside[cell] -= 1
+            else:
+                del self.outside[cell]
+        else:
+            self.cells[i] -= 1
+            if self.changes is not None and not self.cells[i]:
+                self.changes.mark(((i % self.width) * GRID_SIZE, (i // self.width) * GRID_SIZE))
+
+    def add_body(self, cells):
+        for cell in cells:
+            self.add(cell)
+
+    def remove_body(self, cells):
+        for cell in cells:
+            self.remove(cell)
+
+class FoodIndex:
+    # Uniform bucket grid of foods so snakes can find the nearest one without
+    # measuring the distance to every food on the board
+    def __init__(self, width, height, bucket_size=FOOD_BUCKET_SIZE):
+        self.bucket_size = bucket_size
+        self.cols = -(-width // bucket_size)
+        self.rows = -(-height // bucket_size)
+        self.max_x = width - 1
+        self.max_y = height - 1
+        self.distance_checks = 0  # Food distances measured by nearest(), read by the profiler
+        self.changes = None  # When set (a DirtyCells), positions food arrived at or left are marked
+        self.clear()
+
+    def clear(self):
+        # Each bucket holds (order, food) pairs; order mirrors the position in
+        # Game.foods so ties resolve to the same food as min() over the list
+        self.buckets = [[] for _ in range(self.cols * self.rows)]
+        self.next_order = 0
+
+    def bucket(self, pos):
+        return (int(pos[1]) // self.bucket_size) * self.cols + int(pos[0]) // self.bucket_size
+
+    def add(self, food):
+        self.buckets[self.bucket(food.position)].append((self.next_order, food))
+        self.next_order += 1
+        if self.changes is not None:
+            self.changes.mark(food.position)
+
+    def remove(self, food, position=None):
+        if position is None:
+            position = food.position
+        bucket = self.buckets[self.bucket(position)]
+        if self.changes is not None:
+            self.changes.mark(position)
+        for i, (order, item) in enumerate(bucket):
+            if item is food:
+                del bucket[i]
+                return order
+
+    def at(self, pos):
+        # (order, food) pairs sitting exactly on the given cell
+        x, y = pos[0], pos[1]
+        if not (0 <= x <= self.max_x and 0 <= y <= self.max_y):
+            return []  # Food never spawns off the board
+        return [entry for entry in self.buckets[self.bucket(pos)]
+                if entry[1].position.x == x and entry[1].position.y == y]
+
+    def move(self, food, old_position):
+        order = self.remove(food, old_position)
+        self.buckets[self.bucket(food.position)].append((order, food))
+        if self.changes is not None:
+            self.changes.mark(food.position)
+
+    def nearest(self, pos):
+        # Search rings of buckets around the query until no unvisited bucket can
+        # hold anything closer; clamping keeps the ring bound valid off-board
+        px, py = pos[0], pos[1]
+        size = self.bucket_size
+        cx = int(min(max(px, 0), self.max_x)) // size
+        cy = int(min(max(py, 0), self.max_y)) // size
+        best = None
+        best_key = None
+        for r in range(max(self.cols, self.rows)):
+            if best is not None and ((r - 1) * size) ** 2 > best_key[0]:
+                break
+            for bx, by in self._ring(cx, cy, r):
+                bucket = self.buckets[by * self.cols + bx]
+                self.distance_checks += len(bucket)
+                for order, food in bucket:
+                    dx = food.position.x - px
+                    dy = food.position.y - py
+                    key = (dx * dx + dy * dy, order)
+                    if best_key is None or key < best_key:
+                        best_key = key
+                        best = food
+        return best
+
+    def _ring(self, cx, cy, r):
+        if r == 0:
+            yield cx, cy
+            return
+        x0, x1 = max(cx - r, 0), min(cx + r, self.cols - 1)
+        for by in (cy - r, cy + r):
+            if 0 <= by < self.rows:
+                for bx in range(x0, x1 + 1):
+                    yield bx, by
+        y0, y1 = max(cy - r + 1, 0), min(cy + r - 1, self.rows - 1)
+        for bx in (cx - r, cx + r):
+            if 0 <= bx < self.cols:
+                for by in range(y0, y1 + 1):
+                    yield bx, by
+
 class Food:
-    def __init__(self):
-        self.position = pygame.Vector2(
-            random.randrange(0, BOARD_WIDTH, GRID_SIZE),
-            random.randrange(0, BOARD_HEIGHT, GRID_SIZE)
-        )
+    __slots__ = ("rng", "position")
 
-    def respawn(self):
+    def __init__(self, rng=random, position=None):
+        self.rng = rng  # Game's seeded generator; the global random module by default
+        if position is None:
+            position = pygame.Vector2(
+                rng.randrange(0, BOARD_WIDTH, GRID_SIZE),
+                rng.randrange(0, BOARD_HEIGHT, GRID_SIZE)
+            )
+        self.position = position
+
+    def respawn(self, food_index):
+        old_position = self.position
         self.position = pygame.Vector2(
-            random.randrange(0, BOARD_WIDTH, GRID_SIZE),
-            random.randrange(0, BOARD_HEIGHT, GRID_SIZE)
+            self.rng.randrange(0, BOARD_WIDTH, GRID_SIZE),
+            self.rng.randrange(0, BOARD_HEIGHT, GRID_SIZE)
         )
+        food_index.move(self, old_position)
 
-    def draw(self, surface, camera_position, zoom):
-        screen_pos = (self.position - camera_position) * zoom + pygame.Vector2(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
-        rect = pygame.Rect(screen_pos.x, screen_pos.y, GRID_SIZE * zoom, GRID_SIZE * zoom)
-        pygame.draw.rect(surface, RED, rect)
 
 class Snake:
+    # The body is kept as packed cells (see pack_cell) in self.cells; position
+    # and body give the head and segments back as Vector2s, but build them on
+    # every access, so the simulation itself sticks to the cells
+    __slots__ = ("rng", "cells", "grow_segments", "direction", "collision_count",
+                 "stunned", "next_move", "stun_end", "alive")
+
     # Class variable to control snake death on collisions
     death_enabled = True
 
-    def __init__(self):
-        start_pos = pygame.Vector2(
-            random.randrange(0, BOARD_WIDTH, GRID_SIZE),
-            random.randrange(0, BOARD_HEIGHT, GRID_SIZE)
-        )
-        self.body = [start_pos]  # List of segments; head is first element
+    def __init__(self, rng=random, cells=None):
+        # Given cells (when restoring a snapshot) skip the random spawn
+        self.rng = rng
+        if cells is None:
+            cells = deque([pack_cell(rng.randrange(0, BOARD_WIDTH, GRID_SIZE) // GRID_SIZE,
+                                     rng.randrange(0, BOARD_HEIGHT, GRID_SIZE) // GRID_SIZE)])
+        self.cells = cells  # Deque of packed cells; head is first element
         self.grow_segments = 0   # Number of segments to grow (when > 0, skip tail removal)
         self.direction = pygame.Vector2(1, 0)  # Start moving to the right
         self.collision_count = 0
         self.stunned = False
-        self.stun_timer = 0
-        self.move_timer = DEFAULT_MOVE_INTERVAL
+        self.next_move = 1    # Game.move_clock value at which the next move is due
+        self.stun_end = 0     # Game.game_time at which the current stun ends
         self.alive = True
 
     @property
     def position(self):
-        return self.body[0]
+        return cell_position(self.cells[0])
 
-    def update(self, dt, foods, snakes, game_speed):
-        if not self.alive:
-            return
+    @property
+    def head(self):
+        return self.cells[0]
+
+    @property
+    def body(self):
+        return [cell_position(cell) for cell in self.cells]
+
+    @body.setter
+    def body(self, segments):
+        self.cells = deque(pack_position(segment) for segment in segments)
+
+    def wake(self, now, move_clock, food_index, occupancy, planner=None):
+        # Called by Game's scheduler on the first frame at or after next_move,
+        # or stun_end while stunned. With a PathPlanner, it steers whenever it
+        # can and the greedy decide_direction covers the rest
         if self.stunned:
-            self.stun_timer -= dt
-            if self.stun_timer <= 0:
-                self.stunned = False
+            # Stun is over; the move countdown resumes only from this frame
+            self.stunned = False
+            self.next_move = move_clock + 1
             return
 
-        self.move_timer -= dt
-        if self.move_timer <= 0:
-            self.move_timer = game_speed
-            self.decide_direction(foods, snakes)
-            new_head = self.position + self.direction * GRID_SIZE
-
-            # Check collision with other snakes
-            for other in snakes:
-                if other is not self and other.alive and new_head in other.body:
-                    self.handle_collision()
-                    return
-
-            # Move snake: insert new head, remove tail unless growing
-            self.body.insert(0, new_head)
-            if self.grow_segments > 0:
-                self.grow_segments -= 1
-            else:
-                self.body.pop()
+        self.next_move = move_clock + 1
+        if planner is None or not planner.steer(self, food_index):
+            self.decide_direction(food_index, occupancy)
+        cells = self.cells
+        new_head = cells[0] + cell_step(self.direction)
 
-    def decide_direction(self, foods, snakes):
-        if not foods:
+        # Check collision with other snakes (own segments on the cell don't count)
+        occupied = occupancy.count(new_head)
+        if occupied and occupied > cells.count(new_head):
+            self.handle_collision(now, occupancy)
             return
 
+        # Move snake: add new head, remove tail unless growing
+        cells.appendleft(new_head)
+        occupancy.add(new_head)
+        if self.grow_segments > 0:
+            self.grow_segments -= 1
+        else:
+            occupancy.remove(cells.pop())
+
+    def decide_direction(self, food_index, occupancy):
         # Find nearest food
-        nearest_food = min(foods, key=lambda f: self.position.distance_to(f.position))
-        diff = nearest_food.position - self.position
+        position = self.position
+        nearest_food = food_index.nearest(position)
+        if nearest_food is None:
+            return
+
+        diff = nearest_food.position - position
 
         # Determine preferred and alternate directions
         if abs(diff.x) > abs(diff.y):
@@ -231,19 +496,19 @@ class Snake:
             alternate = pygame.Vector2(sign(diff.x), 0) if diff.x != 0 else pygame.Vector2(1, 0)
 
         # Check if current direction is still valid
-        if self.is_safe(self.direction, snakes):
+        if self.is_safe(self.direction, occupancy):
             # Continue in current direction if it's taking us closer to food
-            current_dist = self.position.distance_to(nearest_food.position)
-            next_pos = self.position + self.direction * GRID_SIZE
+            current_dist = position.distance_to(nearest_food.position)
+            next_pos = position + self.direction * GRID_SIZE
             next_dist = next_pos.distance_to(nearest_food.position)
             if next_dist < current_dist:
                 return
 
         # Try preferred direction
-        if self.is_safe(preferred, snakes):
+        if self.is_safe(preferred, occupancy):
             self.direction = preferred
         # Try alternate direction
-        elif self.is_safe(alternate, snakes):
+        elif self.is_safe(alternate, occupancy):
             self.direction = alternate
         # Try other directions if both preferred and alternate are blocked
         else:
@@ -253,48 +518,339 @@ class Snake:
                 pygame.Vector2(0, 1),
                 pygame.Vector2(0, -1)
             ]
-            safe_dirs = [d for d in possible_dirs if self.is_safe(d, snakes)]
+            safe_dirs = [d for d in possible_dirs if self.is_safe(d, occupancy)]
             if safe_dirs:
-                self.direction = random.choice(safe_dirs)
+                self.direction = self.rng.choice(safe_dirs)
 
-    def is_safe(self, direction, snakes):
-        candidate = self.position + direction * GRID_SIZE
+    def is_safe(self, direction, occupancy):
+        candidate = self.cells[0] + cell_step(direction)
         # Check if within bounds
-        if not (0 <= candidate.x < BOARD_WIDTH and 0 <= candidate.y < BOARD_HEIGHT):
-            return False
-        # Check collision with other snakes
-        for other in snakes:
-            if other is not self and other.alive and candidate in other.body:
-                return False
-        # Check self collision (except with tail which will move)
-        if candidate in self.body[:-1]:
+        x, y = unpack_cell(candidate)
+        if not (0 <= x * GRID_SIZE < BOARD_WIDTH and 0 <= y * GRID_SIZE < BOARD_HEIGHT):
             return False
-        return True
+        # Check collision with any snake, except our own tail which will move
+        return occupancy.count(candidate) - (candidate == self.cells[-1]) == 0
 
-    def handle_collision(self):
+    def handle_collision(self, now, occupancy):
         self.stunned = True
-        self.stun_timer = STUN_DURATION
+        self.stun_end = now + STUN_DURATION
         self.collision_count += 1
         if self.collision_count >= 3 and Snake.death_enabled:
             self.alive = False
+            occupancy.remove_body(self.cells)
 
     def grow(self, segments=1):
         self.grow_segments += segments
 
-    def draw(self, surface, camera_position, zoom):
-        if not self.alive:
+class PathPlanner:
+    # Lookahead policy for "Smart Snakes". A snake follows a shortest path to
+    # its nearest food, found by A* over the occupancy grid, and keeps it
+    # across moves until the food is gone or the next step is blocked. A snake
+    # walled off from its food turns towards the neighbouring cell with the
+    # most room, by flood fill. All searches in a tick share a budget of board
+    # cells, counted rather than timed so seeded runs stay reproducible; once
+    # it's spent, or a search hits its own limit, the greedy policy decides
+    def __init__(self, occupancy, budget=PATH_BUDGET, search_limit=PATH_SEARCH_LIMIT):
+        self.occupancy = occupancy
+        self.budget = budget
+        self.search_limit = search_limit
+        self.remaining = budget
+        self.food_cells = set()
+        self.paths = {}     # Snake -> cells still to walk, target food first and next step last
+        self.searched = 0   # Cells searched, read by the profiler
+        self.reused = 0     # Moves taken from a cached path, read by the profiler
+
+    def begin_tick(self, foods):
+        # Foods only move after all snakes have, so their cells hold for the tick
+        self.remaining = self.budget
+        self.food_cells = {self.cell(food.position) for food in foods}
+
+    def cell(self, pos):
+        # Grid index of a position, or -1 off the board
+        x = int(pos[0]) // GRID_SIZE
+        y = int(pos[1]) // GRID_SIZE
+        if 0 <= x < self.occupancy.width and 0 <= y < self.occupancy.height:
+            return y * self.occupancy.width + x
+        return -1
+
+    def neighbours(self, cell):
+        width = self.occupancy.width
+        x = cell % width
+        if x + 1 < width:
+            yield cell + 1
+        if x:
+            yield cell - 1
+        if cell + width < len(self.occupancy.cells):
+            yield cell + width
+        if cell >= width:
+            yield cell - width
+
+    def steer(self, snake, food_index):
+        # Sets snake.direction and returns True, or returns False to leave the
+        # decision to the greedy policy
+        head = self.occupancy.index(snake.head)
+        if head < 0:
+            return False
+        tail = self.occupancy.index(snake.cells[-1])
+        cells = self.occupancy.cells
+        path = self.paths.pop(snake, None)
+        if path and path[-1] == head:
+            path.pop()  # Moved onto the last step
+        # Same check as is_safe: anything but our own tail blocks
+        if path and path[0] in self.food_cells and cells[path[-1]] - (path[-1] == tail) == 0:
+            self.reused += 1
+        else:
+            if self.remaining <= 0:
+                return False
+            food = food_index.nearest(snake.position)
+            if food is None:
+                return False
+            target = self.cell(food.position)
+            if cells[target] - (target == tail) != 0:
+                return False  # Food under a snake; wait for it to clear
+            path, enclosed = self.search(head, tail, target)
+            if not path:
+                if not enclosed:
+                    return False
+                step = self.roomiest(head, tail)
+                if step < 0:
+                    return False
+                path = [step]
+        self.paths[snake] = path
+        step = path[-1] - head
+        width = self.occupancy.width
+        snake.direction = pygame.Vector2(1 if step == 1 else -1 if step == -1 else 0,
+                                         1 if step == width else -1 if step == -width else 0)
+        return True
+
+    def search(self, head, tail, target):
+        # A* from head to target with the Manhattan distance as heuristic.
+        # Returns the path (or None) and whether the search ran out of cells to
+        # visit, meaning the target can't be reached at all
+        cells = self.occupancy.cells
+        width = self.occupancy.width
+        tx = target % width
+        ty = target // width
+        limit = min(self.remaining, self.search_limit)
+        came_from = {head: head}
+        cost = {head: 0}
+        h = abs(head % width - tx) + abs(head // width - ty)
+        # Ties go to the entry nearer the target, then the lower cell, so paths
+        # don't depend on anything but the board
+        frontier = [(h, h, head)]
+        searched = 0
+        found = False
+        while frontier and searched < limit:
+            f, h, current = heapq.heappop(frontier)
+            if current == target:
+                found = True
+                break
+            g = f - h
+            if g > cost[current]:
+                continue  # Already reached more cheaply
+            searched += 1
+            g += 1
+            for cell in self.neighbours(current):
+                if cells[cell] - (cell == tail) == 0 and g < cost.get(cell, g + 1):
+                    cost[cell] = g
+                    came_from[cell] = current
+                    h = abs(cell % width - tx) + abs(cell // width - ty)
+                    heapq.heappush(frontier, (g + h, h, cell))
+        self.remaining -= searched
+        self.searched += searched
+        if not found:
+            return None, not frontier
+        path = []
+        while target != head:
+            path.append(target)
+            target = came_from[target]
+        return path, False
+
+    def roomiest(self, head, tail):
+        # Free neighbour of head with the most cells reachable from it, or -1
+        cells = self.occupancy.cells
+        best = -1
+        best_room = 0
+        for start in self.neighbours(head):
+            if cells[start] - (start == tail) != 0:
+                continue
+            limit = min(self.remaining, self.search_limit)
+            seen = {head, start}
+            stack = [start]
+            while stack and len(seen) <= limit:
+                for cell in self.neighbours(stack.pop()):
+                    if cell not in seen and cells[cell] - (cell == tail) == 0:
+                        seen.add(cell)
+                        stack.append(cell)
+            room = len(seen) - 1
+            self.remaining -= room
+            self.searched += room
+            if room > best_room:
+                best = start
+                best_room = room
+        return best
+
+    def forget(self, snake):
+        self.paths.pop(snake, None)
+
+class DirtyCells:
+    # Board cells waiting to be repainted. A cell is listed once however often
+    # it changes before the next draw, so a game stepped without drawing holds
+    # at most one entry per board cell
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.mask = bytearray(width * height)
+        self.cells = []  # Indices of marked cells, in marking order
+
+    def mark(self, pos):
+        # Positions off the board have no pixel and are dropped
+        x = int(pos[0]) // GRID_SIZE
+        y = int(pos[1]) // GRID_SIZE
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = y * self.width + x
+            if not self.mask[i]:
+                self.mask[i] = 1
+                self.cells.append(i)
+
+    def clear(self):
+        mask = self.mask
+        for i in self.cells:
+            mask[i] = 0
+        self.cells.clear()
+
+class BoardRenderer:
+    # Keeps a persistent surface with one pixel per board cell. The occupancy grid
+    # and food index mark every cell they change in self.changes, and only
+    # those pixels are repainted each frame; the camera's view of the surface is
+    # then scaled onto the screen in a single blit
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.board = pygame.Surface((width, height))
+        self.changes = DirtyCells(width, height)
+        self.reset()
+
+    def reset(self):
+        # Blank board; call before repopulating the occupancy grid and food index
+        self.board.fill(BG_COLOR)
+        self.changes.clear()
+
+    def visible_cells(self, camera_position, zoom):
+        # Rect of board cells the camera can see, clipped to the board
+        half_w = SCREEN_WIDTH / 2 / zoom
+        half_h = SCREEN_HEIGHT / 2 / zoom
+        x0 = max(int((camera_position.x - half_w) // GRID_SIZE), 0)
+        y0 = max(int((camera_position.y - half_h) // GRID_SIZE), 0)
+        x1 = min(int((camera_position.x + half_w) // GRID_SIZE) + 1, self.width)
+        y1 = min(int((camera_position.y + half_h) // GRID_SIZE) + 1, self.height)
+        return pygame.Rect(x0, y0, max(x1 - x0, 0), max(y1 - y0, 0))
+
+    def apply_changes(self, occupancy, food_index):
+        # Snakes are drawn over food. Segments a boxed-in snake pushed off the
+        # board have no cell here and aren't drawn
+        fill = self.board.fill
+        cells = occupancy.cells
+        for i in self.changes.cells:
+            x = i % self.width
+            y = i // self.width
+            if cells[i]:
+                fill(GREEN, (x, y, 1, 1))
+            elif food_index.at((x * GRID_SIZE, y * GRID_SIZE)):
+                fill(RED, (x, y, 1, 1))
+            else:
+                fill(BG_COLOR, (x, y, 1, 1))
+        self.changes.clear()
+
+    def draw(self, surface, occupancy, food_index, camera_position, zoom):
+        self.apply_changes(occupancy, food_index)
+        view = self.visible_cells(camera_position, zoom)
+        if not view.width or not view.height:
             return
-        for segment in self.body:
-            screen_pos = (segment - camera_position) * zoom + pygame.Vector2(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
-            rect = pygame.Rect(screen_pos.x, screen_pos.y, GRID_SIZE * zoom, GRID_SIZE * zoom)
-            pygame.draw.rect(surface, GREEN, rect)
+        cell = GRID_SIZE * zoom
+        size = (max(round(view.width * cell), 1), max(round(view.height * cell), 1))
+        visible = self.board.subsurface(view)
+        if size != view.size:
+            visible = pygame.transform.scale(visible, size)
+        surface.blit(visible, ((view.x * GRID_SIZE - camera_position.x) * zoom + SCREEN_WIDTH / 2,
+                               (view.y * GRID_SIZE - camera_position.y) * zoom + SCREEN_HEIGHT / 2))
+
+class Profiler:
+    # Per-frame phase timings and simulation counters. Phases cost nothing while
+    # disabled; recorded frames feed the in-game overlay and the dump on exit
+    def __init__(self, enabled=False, window=PROFILE_WINDOW):
+        self.enabled = enabled
+        self.frames = []
+        self.recent = deque(maxlen=window)
+        self.current = {}
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.current = {}
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.current[name] = self.current.get(name, 0.0) + elapsed
+
+    def end_frame(self, dt, counters):
+        if not self.enabled:
+            return
+        frame = {"frame": len(self.frames), "dt": dt}
+        frame.update(self.current)
+        frame.update(counters)
+        self.frames.append(frame)
+        self.recent.append(frame)
+        self.current = {}
+
+    def averages(self):
+        # Mean of every recorded field over the recent window
+        totals = {}
+        for frame in self.recent:
+            for key, value in frame.items():
+                if key != "frame":
+                    totals[key] = totals.get(key, 0.0) + value
+        return {key: value / len(self.recent) for key, value in totals.items()}
+
+    def dump(self, path):
+        if not self.frames:
+            return
+        fields = []
+        for frame in self.frames:
+            fields.extend(key for key in frame if key not in fields)
+        with open(path, "w", newline="") as f:
+            if path.endswith(".json"):
+                json.dump(self.frames, f)
+            else:
+                writer = csv.DictWriter(f, fieldnames=fields, restval=0)
+                writer.writeheader()
+                writer.writerows(self.frames)
 
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("AI Snake Game - Pan, Zoom, Grow & UI")
+    def __init__(self, headless=False, seed=None, profile_path=None):
+        # Headless games never open a window or load fonts; see headless.py
+        self.headless = headless
+        # All randomness in a game comes from this generator, so a seed reproduces a run
+        self.seed = seed
+        self.rng = random.Random(seed)
+        if headless:
+            self.screen = None
+            self.font = None
+            self.renderer = None
+        else:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("AI Snake Game - Pan, Zoom, Grow & UI")
+            self.font = pygame.font.SysFont(None, 24)
+            self.renderer = BoardRenderer(BOARD_WIDTH // GRID_SIZE, BOARD_HEIGHT // GRID_SIZE)
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 24)
+        self.ui_cache = SurfaceCache()
 
         # Menu UI elements centered on screen
         menu_x = SCREEN_WIDTH // 2 - 100
@@ -303,10 +859,15 @@ class Game:
         self.food_slider = Slider((menu_x, menu_y + 50), 200, 20, 5, 1000, float(DEFAULT_NUM_FOOD), "Food Spawn")
         self.death_checkbox = Checkbox((menu_x, menu_y + 100), 20, True, "Snake Death")
         self.num_snakes_slider = Slider((menu_x, menu_y + 150), 200, 20, 10, 500, 100, "Num Snakes")
-        self.start_button = Button((menu_x, menu_y + 200), (200, 40), "Start Game")
+        self.smart_checkbox = Checkbox((menu_x, menu_y + 200), 20, False, "Smart Snakes")
+        self.start_button = Button((menu_x, menu_y + 250), (200, 40), "Start Game")
 
         # In-game settings UI (positioned in top-right corner)
         self.show_settings = True
+
+        # Press P to toggle profiling; giving a dump path starts with it on
+        self.profiler = Profiler(enabled=profile_path is not None)
+        self.profile_path = profile_path or PROFILE_DUMP_PATH
         
         # Game state
         self.state = "menu"  # "menu" or "game"
@@ -317,27 +878,71 @@ class Game:
 
         # Game objects
         self.snakes = []
-        self.foods = [Food() for _ in range(DEFAULT_NUM_FOOD)]
+        self.foods = [Food(self.rng) for _ in range(DEFAULT_NUM_FOOD)]
+        self.food_index = FoodIndex(BOARD_WIDTH, BOARD_HEIGHT)
+        for food in self.foods:
+            self.food_index.add(food)
+        self.occupancy = OccupancyGrid(BOARD_WIDTH // GRID_SIZE, BOARD_HEIGHT // GRID_SIZE)
+        self.fresh_food_cells = set()  # Cells where food appeared since the last consumption pass
+        # Stuns run on game time in milliseconds. Moves run on a move clock that
+        # advances by dt / speed, so a speed change rescales every pending move
+        # at once without touching any snake
+        self.game_time = 0
+        self.move_clock = 0
+        self.move_schedule = []  # Heap of (next_move, order in self.snakes, snake)
+        self.stun_schedule = []  # Heap of (stun_end, order in self.snakes, snake)
+
+        # Fast-forward: game milliseconds per real millisecond, and game time
+        # still owed to the simulation from frames that ran out of budget
+        self.time_scale = 1
+        self.sim_backlog = 0
+
+        # Set to a replay.ReplayWriter to record the game from start_game on
+        self.recorder = None
+        self.planner = None  # PathPlanner when the game has smart snakes
+        if self.renderer:
+            # The renderer repaints whatever cells these report as changed
+            self.occupancy.changes = self.food_index.changes = self.renderer.changes
     
     def run(self):
         running = True
         while running:
-            dt = self.clock.tick(244)  # Frame cap updated to 244 fps
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
+            dt = self.clock.tick(MAX_FPS)
+            with self.profiler.phase("events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
 
-                if self.state == "menu":
-                    self.handle_menu_event(event)
-                elif self.state == "game":
-                    self.handle_game_event(event)
+                    if self.state == "menu":
+                        self.handle_menu_event(event)
+                    elif self.state == "game":
+                        self.handle_game_event(event)
 
             if self.state == "menu":
                 self.draw_menu()
             elif self.state == "game":
-                self.update_game(dt)
-                self.draw_game()
+                lookups = self.occupancy.lookups
+                distance_checks = self.food_index.distance_checks
+                path_cells = self.planner.searched if self.planner else 0
+                cache_hits = self.ui_cache.hits
+                cache_misses = self.ui_cache.misses
+                with self.profiler.phase("update_game"):
+                    sim_ticks = self.advance(dt)
+                with self.profiler.phase("draw_game"):
+                    self.draw_game()
+                self.profiler.end_frame(dt, {
+                    "collision_checks": self.occupancy.lookups - lookups,
+                    "distance_checks": self.food_index.distance_checks - distance_checks,
+                    "path_cells": (self.planner.searched if self.planner else 0) - path_cells,
+                    "ui_cache_hits": self.ui_cache.hits - cache_hits,
+                    "ui_cache_misses": self.ui_cache.misses - cache_misses,
+                    "sim_ticks": sim_ticks,
+                    "snakes": len(self.snakes),
+                })
 
+        self.profiler.dump(self.profile_path)
+        if self.recorder:
+            self.recorder.close()
         pygame.quit()
         sys.exit()
 
@@ -347,31 +952,64 @@ class Game:
         self.food_slider.handle_event(event)
         self.death_checkbox.handle_event(event)
         self.num_snakes_slider.handle_event(event)
+        self.smart_checkbox.handle_event(event)
         
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1 and self.start_button.is_clicked(event.pos):
-                # Start game using settings from menu
-                num_snakes = int(self.num_snakes_slider.value)
-                num_food = int(self.food_slider.value)
-                
-                # Initialize game objects with current settings
-                self.snakes = [Snake() for _ in range(num_snakes)]
-                self.foods = [Food() for _ in range(num_food)]
-                
-                # Update snake death setting
-                Snake.death_enabled = self.death_checkbox.checked
-                
-                # Reset camera position and zoom
-                self.camera_position = pygame.Vector2(BOARD_WIDTH / 2, BOARD_HEIGHT / 2)
-                self.zoom = 1.0
-                
-                # Transition to game state
-                self.state = "game"
+                self.start_game()
+
+    def start_game(self):
+        # Start game using settings from menu
+        num_snakes = int(self.num_snakes_slider.value)
+        num_food = int(self.food_slider.value)
+        
+        # Initialize game objects with current settings
+        self.snakes = [Snake(self.rng) for _ in range(num_snakes)]
+        self.foods = [Food(self.rng) for _ in range(num_food)]
+        if self.renderer:
+            self.renderer.reset()
+        self.food_index.clear()
+        for food in self.foods:
+            self.food_index.add(food)
+        self.occupancy.clear()
+        for snake in self.snakes:
+            self.occupancy.add_body(snake.cells)
+        self.game_time = 0
+        self.move_clock = 0
+        self.sim_backlog = 0
+        # The first move comes DEFAULT_MOVE_INTERVAL ms in at the starting speed
+        first_move = DEFAULT_MOVE_INTERVAL / self.speed_slider.value
+        for snake in self.snakes:
+            snake.next_move = first_move
+        self.move_schedule = [(first_move, i, snake) for i, snake in enumerate(self.snakes)]
+        self.stun_schedule = []
+        # Every food is new, so the first consumption pass checks them all
+        self.fresh_food_cells = {(f.position.x, f.position.y) for f in self.foods}
+        
+        # Update snake death setting
+        Snake.death_enabled = self.death_checkbox.checked
+        self.planner = PathPlanner(self.occupancy) if self.smart_checkbox.checked else None
+        if self.recorder:
+            self.recorder.start(self)
+        
+        # Reset camera position and zoom
+        self.camera_position = pygame.Vector2(BOARD_WIDTH / 2, BOARD_HEIGHT / 2)
+        self.zoom = 1.0
+        
+        # Transition to game state
+        self.state = "game"
 
     def handle_game_event(self, event):
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_h:  # Press H to toggle settings UI
                 self.show_settings = not self.show_settings
+            if event.key == pygame.K_p:  # Press P to toggle the profiler overlay
+                self.profiler.toggle()
+            if event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):  # + to fast-forward
+                self.time_scale = min(self.time_scale * 2, MAX_TIME_SCALE)
+            if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):  # - to slow back down
+                self.time_scale = max(self.time_scale // 2, 1)
+                self.sim_backlog = 0
             if event.key == pygame.K_ESCAPE:
                 pygame.event.post(pygame.event.Event(pygame.QUIT))
         if event.type == pygame.MOUSEBUTTONDOWN:
@@ -408,36 +1046,241 @@ class Game:
         self.food_slider.handle_event(event)
         self.death_checkbox.handle_event(event)
 
+    def advance(self, dt):
+        # Run dt real milliseconds of game, times the fast-forward scale. Ticks
+        # are capped at the move interval since a snake moves at most once per
+        # tick. If a frame runs out of budget the remaining game time carries over
+        # to later frames (up to MAX_SIM_BACKLOG). Returns the number of ticks run
+        self.sim_backlog = min(self.sim_backlog + dt * self.time_scale, MAX_SIM_BACKLOG)
+        deadline = time.perf_counter() + SIM_BUDGET_MS / 1000
+        ticks = 0
+        while self.sim_backlog > 0:
+            step = min(self.sim_backlog, self.speed_slider.value)
+            self.update_game(step)
+            self.sim_backlog -= step
+            ticks += 1
+            if time.perf_counter() > deadline:
+                break
+        return ticks
+
     def update_game(self, dt):
-        game_speed = self.speed_slider.value
-        desired_food_count = int(self.food_slider.value)
+        with self.profiler.phase("food_resize"):
+            self.resize_food(int(self.food_slider.value))
+        if self.planner:
+            self.planner.begin_tick(self.foods)
+        with self.profiler.phase("movement"):
+            moved = self.move_snakes(dt, self.speed_slider.value)
+        with self.profiler.phase("consumption"):
+            self.consume_food(moved)
+        if self.recorder:
+            self.recorder.end_tick(dt)
+
+    def resize_food(self, desired_food_count):
         if len(self.foods) < desired_food_count:
             for _ in range(desired_food_count - len(self.foods)):
-                self.foods.append(Food())
+                food = Food(self.rng)
+                self.foods.append(food)
+                self.food_index.add(food)
+                self.fresh_food_cells.add((food.position.x, food.position.y))
+                if self.recorder:
+                    self.recorder.food_added(food)
         elif len(self.foods) > desired_food_count:
+            for food in self.foods[desired_food_count:]:
+                self.food_index.remove(food)
             self.foods = self.foods[:desired_food_count]
+            if self.recorder:
+                self.recorder.foods_truncated(desired_food_count)
+
+    def move_snakes(self, dt, game_speed):
+        # Wake only the snakes whose next move or stun expiry has come due, in
+        # the order of self.snakes as collisions depend on who moves first.
+        # Returns the snakes whose head moved this frame
+        self.game_time += dt
+        self.move_clock += dt / game_speed
+        due = []
+        while self.move_schedule and self.move_schedule[0][0] <= self.move_clock + MOVE_CLOCK_EPSILON:
+            due.append(heapq.heappop(self.move_schedule))
+        while self.stun_schedule and self.stun_schedule[0][0] <= self.game_time:
+            due.append(heapq.heappop(self.stun_schedule))
+        due.sort(key=lambda entry: entry[1])
+
+        moved = []
+        died = False
+        recorder = self.recorder
+        for _, order, snake in due:
+            head = snake.head
+            if recorder:
+                before = (snake.direction, snake.stunned, len(snake.cells))
+            snake.wake(self.game_time, self.move_clock, self.food_index, self.occupancy, self.planner)
+            if recorder:
+                recorder.snake_woke(order, snake, head, *before)
+            if not snake.alive:
+                died = True
+                if self.planner:
+                    self.planner.forget(snake)
+            elif snake.stunned:
+                heapq.heappush(self.stun_schedule, (snake.stun_end, order, snake))
+            else:
+                heapq.heappush(self.move_schedule, (snake.next_move, order, snake))
+            if snake.head != head:
+                moved.append(snake)
+        if died:
+            self.snakes = [s for s in self.snakes if s.alive]
+        return moved
+
+    def consume_food(self, moved):
+        # Check for food consumption. A snake only reaches food by moving onto it
+        # (no other head can share a cell it just moved into), or food appears
+        # under a snake that stayed put
+        eaten = {}
+        for snake in moved:
+            for order, food in self.food_index.at(snake.position):
+                eaten[order] = (food, snake)
+        # The grid is read directly so these checks aren't counted as collision lookups
+        grid = self.occupancy.cells
+        for cell in self.fresh_food_cells:
+            packed = pack_position(cell)
+            i = self.occupancy.index(packed)
+            if i >= 0 and grid[i]:
+                for snake in self.snakes:
+                    if snake.head == packed:
+                        for order, food in self.food_index.at(cell):
+                            eaten[order] = (food, snake)
+                        break
+        self.fresh_food_cells = set()
 
+        # Feed in food list order so respawns happen in the same order as before
+        for order in sorted(eaten):
+            food, snake = eaten[order]
+            snake.grow(1)
+            food.respawn(self.food_index)
+            self.fresh_food_cells.add((food.position.x, food.position.y))
+            if self.recorder:
+                self.recorder.food_eaten(snake, food)
+
+    def checksum(self):
+        # CRC of the observable game state (bodies, direction, growth, collisions,
+        # stuns and food), for checking that two runs match tick by tick. Scheduler
+        # internals are left out so the checksum stays the same when timing code changes
+        state = array('d')
+        for snake in self.snakes:
+            state.append(len(snake.cells))
+            for cell in snake.cells:
+                x, y = unpack_cell(cell)
+                state.extend((x * GRID_SIZE, y * GRID_SIZE))
+            state.extend(snake.direction)
+            state.extend((snake.grow_segments, snake.collision_count, snake.stunned))
+        for food in self.foods:
+            state.extend(food.position)
+        return zlib.crc32(state.tobytes())
+
+    def snapshot(self):
+        # Everything the simulation needs to carry on exactly where it is, as
+        # compact bytes for restore(). Scheduler order is implied by the order
+        # of self.snakes and food order by self.foods, so neither is stored
+        snake_ints = array('i')
+        snake_times = array('d')
+        segments = array('i')
+        paths = array('i')
+        planned = self.planner.paths if self.planner else {}
         for snake in self.snakes:
-            snake.update(dt, self.foods, self.snakes, game_speed)
-        self.snakes = [s for s in self.snakes if s.alive]
+            path = planned.get(snake, ())
+            paths.extend(path)
+            snake_ints.extend((len(snake.cells), int(snake.direction.x), int(snake.direction.y),
+                               snake.collision_count, snake.grow_segments, snake.stunned, len(path)))
+            snake_times.extend((snake.next_move, snake.stun_end))
+            segments.extend(snake.cells)
+        foods = array('i', [int(v) for food in self.foods for v in food.position])
+        fresh = array('i', [int(v) for cell in self.fresh_food_cells for v in cell])
+        _, rng_state, gauss_next = self.rng.getstate()
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.seed is not None, self.seed or 0,
+            len(self.snakes), len(segments), len(self.foods), len(self.fresh_food_cells), len(paths),
+            self.game_time, self.move_clock, self.sim_backlog, self.time_scale,
+            self.speed_slider.value, self.food_slider.value, self.num_snakes_slider.value,
+            self.death_checkbox.checked, self.planner is not None, gauss_next is not None, gauss_next or 0.0)
+        return b"".join((header, array('I', rng_state).tobytes(), snake_ints.tobytes(), snake_times.tobytes(),
+                         segments.tobytes(), foods.tobytes(), fresh.tobytes(), paths.tobytes()))
+
+    def restore(self, data):
+        # Replace the current game, or start one from the menu, with a snapshot()
+        # of this or any other Game. The game then plays on exactly as the
+        # snapshotted one would, so one snapshot can seed many what-if runs
+        (magic, version, has_seed, seed, num_snakes, num_segments, num_foods, num_fresh, num_path_cells,
+         game_time, move_clock, sim_backlog, time_scale, speed, food_count, snake_count,
+         death_enabled, smart, has_gauss, gauss_next) = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("not a game snapshot")
+        offset = SNAPSHOT_HEADER.size
+        rng_state, offset = read_array(data, offset, 'I', 625)
+        snake_ints, offset = read_array(data, offset, 'i', SNAPSHOT_SNAKE_INTS * num_snakes)
+        snake_times, offset = read_array(data, offset, 'd', SNAPSHOT_SNAKE_TIMES * num_snakes)
+        segments, offset = read_array(data, offset, 'i', num_segments)
+        foods, offset = read_array(data, offset, 'i', 2 * num_foods)
+        fresh, offset = read_array(data, offset, 'i', 2 * num_fresh)
+        paths, offset = read_array(data, offset, 'i', num_path_cells)
+
+        self.seed = seed if has_seed else None
+        self.rng.setstate((3, tuple(rng_state), gauss_next if has_gauss else None))
+        self.speed_slider.value = speed
+        self.food_slider.value = food_count
+        self.num_snakes_slider.value = snake_count
+        self.death_checkbox.checked = death_enabled
+        Snake.death_enabled = death_enabled
+        self.smart_checkbox.checked = smart
+        self.planner = PathPlanner(self.occupancy) if smart else None
+        self.game_time = game_time
+        self.move_clock = move_clock
+        self.sim_backlog = sim_backlog
+        self.time_scale = int(time_scale)
+
+        Vector2 = pygame.Vector2
+        self.snakes = []
+        start = 0
+        path_start = 0
+        for i in range(num_snakes):
+            (length, dx, dy, collisions, grow, stunned,
+             path_length) = snake_ints[i * SNAPSHOT_SNAKE_INTS:(i + 1) * SNAPSHOT_SNAKE_INTS]
+            end = start + length
+            snake = Snake(self.rng, deque(segments[start:end]))
+            start = end
+            snake.direction = Vector2(dx, dy)
+            snake.collision_count = collisions
+            snake.grow_segments = grow
+            snake.stunned = bool(stunned)
+            snake.next_move, snake.stun_end = snake_times[2 * i:2 * i + 2]
+            if path_length:
+                self.planner.paths[snake] = paths[path_start:path_start + path_length].tolist()
+                path_start += path_length
+            self.snakes.append(snake)
+        self.foods = [Food(self.rng, Vector2(x, y)) for x, y in zip(foods[0::2], foods[1::2])]
+        self.fresh_food_cells = {(float(x), float(y)) for x, y in zip(fresh[0::2], fresh[1::2])}
 
-        # Check for food consumption
+        # Rebuild the lookups and schedules exactly as start_game would
+        if self.renderer:
+            self.renderer.reset()
+        self.food_index.clear()
         for food in self.foods:
-            for snake in self.snakes:
-                if snake.alive and snake.position == food.position:
-                    snake.grow(1)
-                    food.respawn()
-                    break
+            self.food_index.add(food)
+        self.occupancy.clear()
+        for snake in self.snakes:
+            self.occupancy.add_body(snake.cells)
+        self.move_schedule = [(s.next_move, i, s) for i, s in enumerate(self.snakes) if not s.stunned]
+        self.stun_schedule = [(s.stun_end, i, s) for i, s in enumerate(self.snakes) if s.stunned]
+        heapq.heapify(self.move_schedule)
+        heapq.heapify(self.stun_schedule)
+        self.state = "game"
 
     def draw_menu(self):
         self.screen.fill(BG_COLOR)
-        self.speed_slider.draw(self.screen, self.font)
-        self.food_slider.draw(self.screen, self.font)
-        self.death_checkbox.draw(self.screen, self.font)
-        self.num_snakes_slider.draw(self.screen, self.font)
-        self.start_button.draw(self.screen, self.font)
+        self.speed_slider.draw(self.screen, self.font, self.ui_cache)
+        self.food_slider.draw(self.screen, self.font, self.ui_cache)
+        self.death_checkbox.draw(self.screen, self.font, self.ui_cache)
+        self.num_snakes_slider.draw(self.screen, self.font, self.ui_cache)
+        self.smart_checkbox.draw(self.screen, self.font, self.ui_cache)
+        self.start_button.draw(self.screen, self.font, self.ui_cache)
         # Draw instructions
-        instruct = self.font.render("Adjust settings then click 'Start Game'", True, SLIDER_TEXT_COLOR)
+        instruct = self.ui_cache.text("instructions", self.font, "Adjust settings then click 'Start Game'", SLIDER_TEXT_COLOR)
         instruct_rect = instruct.get_rect(center=(SCREEN_WIDTH // 2, (self.start_button.rect.y + self.start_button.rect.height) + 30))
         self.screen.blit(instruct, instruct_rect)
         pygame.display.flip()
@@ -446,10 +1289,7 @@ class Game:
         self.screen.fill(BG_COLOR)
         
         # Draw all game objects
-        for food in self.foods:
-            food.draw(self.screen, self.camera_position, self.zoom)
-        for snake in self.snakes:
-            snake.draw(self.screen, self.camera_position, self.zoom)
+        self.renderer.draw(self.screen, self.occupancy, self.food_index, self.camera_position, self.zoom)
         
         # Draw UI in top-right corner if enabled
         if self.show_settings:
@@ -458,27 +1298,67 @@ class Game:
             
             # Draw semi-transparent background panel for UI
             panel_rect = pygame.Rect(ui_x - 10, ui_y - 30, 230, 160)
-            panel_surface = pygame.Surface((panel_rect.width, panel_rect.height), pygame.SRCALPHA)
-            pygame.draw.rect(panel_surface, UI_PANEL_BG, panel_surface.get_rect(), border_radius=10)
-            self.screen.blit(panel_surface, panel_rect)
+            self.screen.blit(self.ui_cache.panel(panel_rect.size, UI_PANEL_BG, 10), panel_rect)
             
             # Position and draw UI elements
             self.speed_slider.rect.topleft = (ui_x, ui_y)
             self.food_slider.rect.topleft = (ui_x, ui_y + 50)
             self.death_checkbox.rect.topleft = (ui_x, ui_y + 100)
             
-            self.speed_slider.draw(self.screen, self.font)
-            self.food_slider.draw(self.screen, self.font)
-            self.death_checkbox.draw(self.screen, self.font)
+            self.speed_slider.draw(self.screen, self.font, self.ui_cache)
+            self.food_slider.draw(self.screen, self.font, self.ui_cache)
+            self.death_checkbox.draw(self.screen, self.font, self.ui_cache)
             
             # Draw hide instruction with background
             hide_text = "Press H to hide settings"
-            text_surf = self.font.render(hide_text, True, SLIDER_TEXT_COLOR)
+            text_surf = self.ui_cache.text("hide_hint", self.font, hide_text, SLIDER_TEXT_COLOR)
             text_rect = text_surf.get_rect(bottomright=(SCREEN_WIDTH - 10, panel_rect.bottom + 25))
             self.screen.blit(text_surf, text_rect)
+
+            # Fast-forward state, and whether the simulation is keeping up
+            time_text = f"Time x{self.time_scale} (+/- to change)"
+            if self.sim_backlog > self.speed_slider.value:
+                time_text += " - catching up"
+            text_surf = self.ui_cache.text("time_scale", self.font, time_text, SLIDER_TEXT_COLOR)
+            text_rect = text_surf.get_rect(bottomright=(SCREEN_WIDTH - 10, panel_rect.bottom + 50))
+            self.screen.blit(text_surf, text_rect)
+
+        if self.profiler.enabled:
+            self.draw_profiler()
             
         pygame.display.flip()
 
+    def draw_profiler(self):
+        # Averages over the last frames, to the left of the settings panel
+        stats = self.profiler.averages()
+        frame_ms = sum(stats.get(name, 0.0) for name in ("events", "update_game", "draw_game"))
+        lines = [
+            (f"Frame: {frame_ms:.2f} / {1000 / MAX_FPS:.2f} ms", RED if frame_ms > 1000 / MAX_FPS else SLIDER_TEXT_COLOR),
+            (f"Events: {stats.get('events', 0.0):.2f} ms", SLIDER_TEXT_COLOR),
+            (f"Update: {stats.get('update_game', 0.0):.2f} ms ({stats.get('sim_ticks', 0.0):.1f} ticks)", SLIDER_TEXT_COLOR),
+            (f"  Food resize: {stats.get('food_resize', 0.0):.2f} ms", SLIDER_TEXT_COLOR),
+            (f"  Movement: {stats.get('movement', 0.0):.2f} ms", SLIDER_TEXT_COLOR),
+            (f"  Consumption: {stats.get('consumption', 0.0):.2f} ms", SLIDER_TEXT_COLOR),
+            (f"Draw: {stats.get('draw_game', 0.0):.2f} ms", SLIDER_TEXT_COLOR),
+            (f"Collision checks: {stats.get('collision_checks', 0.0):.0f}", SLIDER_TEXT_COLOR),
+            (f"Distance checks: {stats.get('distance_checks', 0.0):.0f}", SLIDER_TEXT_COLOR),
+            (f"Path cells searched: {stats.get('path_cells', 0.0):.0f}", SLIDER_TEXT_COLOR),
+            (f"UI cache hits/misses: {stats.get('ui_cache_hits', 0.0):.1f} / {stats.get('ui_cache_misses', 0.0):.1f}", SLIDER_TEXT_COLOR),
+        ]
+        panel_rect = pygame.Rect(SCREEN_WIDTH - 250 - 240, 10, 230, 20 * len(lines) + 20)
+        self.screen.blit(self.ui_cache.panel(panel_rect.size, UI_PANEL_BG, 10), panel_rect)
+        for i, (text, color) in enumerate(lines):
+            text_surf = self.ui_cache.text(("profiler", i), self.font, text, color)
+            self.screen.blit(text_surf, (panel_rect.x + 10, panel_rect.y + 10 + 20 * i))
+
 if __name__ == '__main__':
-    game = Game()
+    parser = argparse.ArgumentParser(description="Play the snake game in a window")
+    parser.add_argument("--profile", default=None,
+                        help="start with the profiler on and write its frames here (.csv or .json)")
+    parser.add_argument("--record", default=None, help="save the game here for replay.py")
+    args = parser.parse_args()
+    game = Game(profile_path=args.profile)
+    if args.record:
+        from replay import ReplayWriter
+        game.recorder = ReplayWriter(args.record)
     game.run()
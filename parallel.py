@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine import ArrayEngine, steer
+
+DEFAULT_TILES = (2, 2)          # board split into columns x rows of tiles
+PARALLEL_MIN_SNAKES = 256       # below this many moving snakes a tick is steered in-process
+
+# Worker-side view of the shared occupancy grid, attached once per process
+_worker_grid = None
+
+def _attach_grid(name, size):
+    global _worker_grid
+    shm = shared_memory.SharedMemory(name=name)
+    _worker_grid = (shm, np.ndarray(size, dtype=np.uint16, buffer=shm.buf))
+
+def _steer_tile(heads, tails, current, food_cells, cols, rows, weights):
+    return steer(heads, tails, current, food_cells, _worker_grid[1], cols, rows, weights)
+
+class TiledEngine(ArrayEngine):
+    # ArrayEngine that splits the board into tiles and steers each tile's snakes
+    # in a process pool. Snakes belong to the tile their head is in, so they
+    # migrate between tiles as they move. The occupancy grid lives in shared
+    # memory: workers read their tile and the one-cell border around it straight
+    # from it after every tick's moves, instead of copying border strips around.
+    #
+    # Steering is the only step that scales with snakes x food; moves, collisions
+    # and eating stay in the main process. Every random number is still drawn
+    # there in snake order, so a run matches ArrayEngine with the same seed
+    # exactly, tick for tick. For the same reason each worker still searches
+    # all food, so tiles only decide which snakes are steered together.
+    #
+    # Ticks where fewer than min_snakes snakes move are steered in-process, as
+    # shipping them to the pool costs more than it saves. The default keeps the
+    # pool busy from about half the menu's 500-snake limit up
+    def __init__(self, num_snakes, *args, tiles=DEFAULT_TILES, workers=None,
+                 min_snakes=PARALLEL_MIN_SNAKES, **kwargs):
+        super().__init__(num_snakes, *args, **kwargs)
+        self.tiles = tiles
+        self.min_snakes = min_snakes
+        grid = self.occupancy
+        self.shm = shared_memory.SharedMemory(create=True, size=grid.nbytes)
+        self.occupancy = np.ndarray(grid.shape, dtype=grid.dtype, buffer=self.shm.buf)
+        self.occupancy[:] = grid
+        try:
+            self.pool = ProcessPoolExecutor(max_workers=workers or min(tiles[0] * tiles[1], os.cpu_count() or 1),
+                                            initializer=_attach_grid, initargs=(self.shm.name, grid.size))
+        except BaseException:
+            # A bad tiles or workers value mustn't leave the shared block behind
+            self.shm.close()
+            self.shm.unlink()
+            raise
+
+    def close(self):
+        self.pool.shutdown()
+        grid = self.occupancy.copy()
+        self.occupancy = grid  # Stay usable after the shared block is gone
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tile_of(self, heads):
+        tiles_x, tiles_y = self.tiles
+        tx = (heads % self.cols) * tiles_x // self.cols
+        ty = (heads // self.cols) * tiles_y // self.rows
+        return ty * tiles_x + tx
+
+    def _decide_directions(self, idx):
+        if len(idx) < self.min_snakes:
+            super()._decide_directions(idx)
+            return
+        if not len(self.food_cells):
+            return
+        heads = self.cells[idx, self.head[idx]]
+        tails = self.cells[idx, (self.head[idx] + self.length[idx] - 1) % self.capacity]
+        current = self.direction[idx]
+        weights = self.rng.random((len(idx), 4))
+
+        tile = self.tile_of(heads)
+        jobs = []
+        for t in range(self.tiles[0] * self.tiles[1]):
+            sel = np.flatnonzero(tile == t)
+            if len(sel):
+                jobs.append((sel, self.pool.submit(_steer_tile, heads[sel], tails[sel], current[sel],
+                                                   self.food_cells, self.cols, self.rows, weights[sel])))
+        directions = current.copy()
+        for sel, job in jobs:
+            directions[sel] = job.result()
+        self.direction[idx] = directions
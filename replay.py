@@ -0,0 +1,457 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections import deque
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from main import (BOARD_WIDTH, BOARD_HEIGHT, GRID_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT,
+                  GREEN, RED, BG_COLOR, SLIDER_TEXT_COLOR, MAX_FPS, unpack_cell)
+
+# A replay file is a header, a keyframe of the starting board, then per-tick
+# delta records ending in a TICK record. Another full keyframe follows every
+# KEYFRAME_INTERVAL ticks so playback can seek without reading from the start.
+# A finished recording ends with an END record, the keyframe index and a footer;
+# a recording cut short (crash, kill) is still readable by scanning it.
+# Positions are stored as board cells, everything little-endian.
+MAGIC = b"SNKR"
+INDEX_MAGIC = b"SNKI"
+VERSION = 1
+KEYFRAME_INTERVAL = 100      # ticks between full-state keyframes
+WRITE_BUFFER = 1 << 20       # bytes buffered before the recording hits the disk
+
+# Record types
+END, TICK, MOVE, TURN, STUN, UNSTUN, DEATH, EAT, FOOD_ADD, FOOD_TRUNCATE, KEYFRAME = range(11)
+
+# Direction codes. A move only stores its direction, the new head follows from it
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1), (0, 0))
+DIRECTION_CODES = {d: code for code, d in enumerate(DIRECTIONS)}
+DIRECTION_MASK = 0x07
+GREW = 0x08  # MOVE flag: the snake grew, so its tail stayed put
+
+HEADER = struct.Struct("<4sHBqIIII")     # magic, version, has seed, seed, cols, rows, keyframe interval, snakes
+TICK_RECORD = struct.Struct("<Bf")       # dt in game milliseconds
+SNAKE_RECORD = struct.Struct("<BI")      # STUN, UNSTUN and DEATH: snake
+CODE_RECORD = struct.Struct("<BIB")      # MOVE and TURN: snake, direction code (| GREW)
+EAT_RECORD = struct.Struct("<BIIii")     # snake, food slot, cell the food respawned at
+FOOD_ADD_RECORD = struct.Struct("<Bii")  # cell of a food appended to the list
+FOOD_TRUNCATE_RECORD = struct.Struct("<BI")  # foods kept
+KEYFRAME_RECORD = struct.Struct("<BII")  # tick, payload bytes
+KEYFRAME_SNAKE = struct.Struct("<BBIII")  # flags, direction code, collisions, grow segments, body length
+KEYFRAME_COUNT = struct.Struct("<I")
+INDEX_ENTRY = struct.Struct("<IQ")       # tick, file offset of the KEYFRAME record
+FOOTER = struct.Struct("<IIQ4s")         # ticks, keyframes, index offset, magic
+
+SNAKE_ALIVE = 1
+SNAKE_STUNNED = 2
+
+RECORD_SIZES = {
+    TICK: TICK_RECORD.size,
+    MOVE: CODE_RECORD.size,
+    TURN: CODE_RECORD.size,
+    STUN: SNAKE_RECORD.size,
+    UNSTUN: SNAKE_RECORD.size,
+    DEATH: SNAKE_RECORD.size,
+    EAT: EAT_RECORD.size,
+    FOOD_ADD: FOOD_ADD_RECORD.size,
+    FOOD_TRUNCATE: FOOD_TRUNCATE_RECORD.size,
+}
+
+def cell(pos):
+    return int(pos[0]) // GRID_SIZE, int(pos[1]) // GRID_SIZE
+
+def pack_cells(cells):
+    packed = array('i', [v for xy in cells for v in xy])
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+def unpack_cells(data, offset, count):
+    packed = array('i')
+    packed.frombytes(data[offset:offset + 8 * count])
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return list(zip(packed[0::2], packed[1::2]))
+
+class ReplayWriter:
+    # Streams a game to a replay file while it plays. Set it as Game.recorder
+    # before start_game (or call start() right after); update_game then reports
+    # what changed through the hooks below. A tick's records are collected in
+    # memory and handed to the buffered file in one write when the tick ends.
+    # The file is only created by start(), so a game that never started
+    # leaves nothing behind
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.file = None
+        self.keyframe_interval = keyframe_interval
+        self.records = bytearray()
+        self.offset = 0
+        self.ticks = 0
+        self.keyframes = []  # (tick, file offset)
+        self.snakes = []     # Every snake of the game, dead or alive; the index is its id
+        self.snake_ids = {}
+        self.foods = []      # Game.foods as of the last record
+        self.food_slots = {}
+
+    def start(self, game):
+        self.file = open(self.path, "wb", buffering=WRITE_BUFFER)
+        self.snakes = list(game.snakes)
+        self.snake_ids = {snake: i for i, snake in enumerate(self.snakes)}
+        self.foods = list(game.foods)
+        self.food_slots = {food: i for i, food in enumerate(self.foods)}
+        seed = game.seed
+        self._write(HEADER.pack(MAGIC, VERSION, seed is not None, seed or 0,
+                                BOARD_WIDTH // GRID_SIZE, BOARD_HEIGHT // GRID_SIZE,
+                                self.keyframe_interval, len(self.snakes)))
+        self.keyframe()
+
+    def _write(self, data):
+        self.file.write(data)
+        self.offset += len(data)
+
+    def snake_woke(self, snake_id, snake, head, direction, stunned, length):
+        # Called after Snake.wake with the head cell, direction, stun state and
+        # body length it had before. Snake ids are the order in Game's schedule
+        if snake.head != head:
+            code = DIRECTION_CODES[int(snake.direction.x), int(snake.direction.y)]
+            if len(snake.cells) > length:
+                code |= GREW
+            self.records += CODE_RECORD.pack(MOVE, snake_id, code)
+            return
+        if snake.direction != direction:
+            code = DIRECTION_CODES[int(snake.direction.x), int(snake.direction.y)]
+            self.records += CODE_RECORD.pack(TURN, snake_id, code)
+        if snake.stunned != stunned:
+            self.records += SNAKE_RECORD.pack(STUN if snake.stunned else UNSTUN, snake_id)
+        if not snake.alive:
+            self.records += SNAKE_RECORD.pack(DEATH, snake_id)
+
+    def food_eaten(self, snake, food):
+        # Called after the food respawned
+        x, y = cell(food.position)
+        self.records += EAT_RECORD.pack(EAT, self.snake_ids[snake], self.food_slots[food], x, y)
+
+    def food_added(self, food):
+        self.food_slots[food] = len(self.foods)
+        self.foods.append(food)
+        x, y = cell(food.position)
+        self.records += FOOD_ADD_RECORD.pack(FOOD_ADD, x, y)
+
+    def foods_truncated(self, count):
+        for food in self.foods[count:]:
+            del self.food_slots[food]
+        del self.foods[count:]
+        self.records += FOOD_TRUNCATE_RECORD.pack(FOOD_TRUNCATE, count)
+
+    def end_tick(self, dt):
+        self.records += TICK_RECORD.pack(TICK, dt)
+        self._write(self.records)
+        self.records.clear()
+        self.ticks += 1
+        if self.ticks % self.keyframe_interval == 0:
+            self.keyframe()
+
+    def keyframe(self):
+        payload = bytearray(KEYFRAME_COUNT.pack(len(self.snakes)))
+        for snake in self.snakes:
+            if snake.alive:
+                flags = SNAKE_ALIVE | (SNAKE_STUNNED if snake.stunned else 0)
+                body = [unpack_cell(packed) for packed in snake.cells]
+            else:
+                flags = 0
+                body = []
+            direction = DIRECTION_CODES[int(snake.direction.x), int(snake.direction.y)]
+            payload += KEYFRAME_SNAKE.pack(flags, direction, snake.collision_count,
+                                           snake.grow_segments, len(body))
+            payload += pack_cells(body)
+        payload += KEYFRAME_COUNT.pack(len(self.foods))
+        payload += pack_cells(cell(food.position) for food in self.foods)
+        self.keyframes.append((self.ticks, self.offset))
+        self._write(KEYFRAME_RECORD.pack(KEYFRAME, self.ticks, len(payload)))
+        self._write(payload)
+
+    def close(self):
+        if self.file is None or self.file.closed:
+            return
+        self._write(bytes([END]))
+        index_offset = self.offset
+        for tick, offset in self.keyframes:
+            self._write(INDEX_ENTRY.pack(tick, offset))
+        self._write(FOOTER.pack(self.ticks, len(self.keyframes), index_offset, INDEX_MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ReplaySnake:
+    # A snake as playback sees it: body is a deque of (x, y) cells, head first
+    def __init__(self, body, direction, stunned, alive, collision_count, grow_segments):
+        self.body = deque(body)
+        self.direction = direction  # Direction code, see DIRECTIONS
+        self.stunned = stunned
+        self.alive = alive
+        self.collision_count = collision_count
+        self.grow_segments = grow_segments
+
+class ReplayState:
+    # The board at one tick of a replay. Snakes are indexed by id and stay in
+    # the list after dying, with an empty body
+    def __init__(self, tick, snakes, foods):
+        self.tick = tick
+        self.snakes = snakes
+        self.foods = foods  # (x, y) cells, in Game.foods order
+        self.dt = 0.0       # Game milliseconds the last tick covered
+
+class ReplayReader:
+    # Memory-maps a replay file. Seeking decodes the nearest keyframe at or
+    # before the wanted tick and applies the deltas from there
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is too short to be a replay file")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, has_seed, seed, self.cols, self.rows,
+         self.keyframe_interval, self.num_snakes) = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        if version != VERSION:
+            raise ValueError(f"{path} is replay version {version}, expected {VERSION}")
+        self.seed = seed if has_seed else None
+        self.complete = self.data[-len(INDEX_MAGIC):] == INDEX_MAGIC
+        if self.complete:
+            self.ticks, self.keyframes = self._read_index()
+        else:
+            self.ticks, self.keyframes = self._scan()
+        self.keyframe_ticks = [tick for tick, _ in self.keyframes]
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_index(self):
+        ticks, count, index_offset, _ = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        keyframes = [INDEX_ENTRY.unpack_from(self.data, index_offset + i * INDEX_ENTRY.size)
+                     for i in range(count)]
+        return ticks, keyframes
+
+    def _scan(self):
+        # No index: walk the records, stopping at the last complete tick
+        data = self.data
+        offset = HEADER.size
+        ticks = 0
+        keyframes = []
+        while offset < len(data) and data[offset] != END:
+            kind = data[offset]
+            if kind == KEYFRAME:
+                if offset + KEYFRAME_RECORD.size > len(data):
+                    break
+                _, tick, size = KEYFRAME_RECORD.unpack_from(data, offset)
+                if offset + KEYFRAME_RECORD.size + size > len(data):
+                    break
+                keyframes.append((tick, offset))
+                offset += KEYFRAME_RECORD.size + size
+                continue
+            if kind not in RECORD_SIZES:
+                raise ValueError(f"corrupt replay record {kind} at byte {offset}")
+            offset += RECORD_SIZES[kind]
+            if offset > len(data):
+                break
+            if kind == TICK:
+                ticks += 1
+        if not keyframes:
+            raise ValueError("replay has no starting keyframe")
+        return ticks, keyframes
+
+    def _load_keyframe(self, offset):
+        # Returns the state stored at a KEYFRAME record and the offset after it
+        data = self.data
+        _, tick, size = KEYFRAME_RECORD.unpack_from(data, offset)
+        offset += KEYFRAME_RECORD.size
+        end = offset + size
+        (num_snakes,) = KEYFRAME_COUNT.unpack_from(data, offset)
+        offset += KEYFRAME_COUNT.size
+        snakes = []
+        for _ in range(num_snakes):
+            flags, direction, collisions, grow, length = KEYFRAME_SNAKE.unpack_from(data, offset)
+            offset += KEYFRAME_SNAKE.size
+            snakes.append(ReplaySnake(unpack_cells(data, offset, length), direction,
+                                      bool(flags & SNAKE_STUNNED), bool(flags & SNAKE_ALIVE),
+                                      collisions, grow))
+            offset += 8 * length
+        (num_foods,) = KEYFRAME_COUNT.unpack_from(data, offset)
+        offset += KEYFRAME_COUNT.size
+        foods = unpack_cells(data, offset, num_foods)
+        return ReplayState(tick, snakes, foods), end
+
+    def _apply(self, state, offset, tick):
+        # Apply records to state until it reaches the given tick
+        data = self.data
+        snakes = state.snakes
+        foods = state.foods
+        while state.tick < tick:
+            kind = data[offset]
+            if kind == TICK:
+                state.dt = TICK_RECORD.unpack_from(data, offset)[1]
+                state.tick += 1
+                offset += TICK_RECORD.size
+            elif kind == MOVE:
+                _, i, code = CODE_RECORD.unpack_from(data, offset)
+                offset += CODE_RECORD.size
+                snake = snakes[i]
+                snake.direction = code & DIRECTION_MASK
+                dx, dy = DIRECTIONS[snake.direction]
+                x, y = snake.body[0]
+                snake.body.appendleft((x + dx, y + dy))
+                if code & GREW:
+                    snake.grow_segments -= 1
+                else:
+                    snake.body.pop()
+            elif kind == TURN:
+                _, i, code = CODE_RECORD.unpack_from(data, offset)
+                offset += CODE_RECORD.size
+                snakes[i].direction = code
+            elif kind == STUN:
+                snake = snakes[SNAKE_RECORD.unpack_from(data, offset)[1]]
+                offset += SNAKE_RECORD.size
+                snake.stunned = True
+                snake.collision_count += 1
+            elif kind == UNSTUN:
+                snakes[SNAKE_RECORD.unpack_from(data, offset)[1]].stunned = False
+                offset += SNAKE_RECORD.size
+            elif kind == DEATH:
+                snake = snakes[SNAKE_RECORD.unpack_from(data, offset)[1]]
+                offset += SNAKE_RECORD.size
+                snake.alive = False
+                snake.body.clear()
+            elif kind == EAT:
+                _, i, slot, x, y = EAT_RECORD.unpack_from(data, offset)
+                offset += EAT_RECORD.size
+                snakes[i].grow_segments += 1
+                foods[slot] = (x, y)
+            elif kind == FOOD_ADD:
+                _, x, y = FOOD_ADD_RECORD.unpack_from(data, offset)
+                offset += FOOD_ADD_RECORD.size
+                foods.append((x, y))
+            elif kind == FOOD_TRUNCATE:
+                del foods[FOOD_TRUNCATE_RECORD.unpack_from(data, offset)[1]:]
+                offset += FOOD_TRUNCATE_RECORD.size
+            elif kind == KEYFRAME:
+                offset += KEYFRAME_RECORD.size + KEYFRAME_RECORD.unpack_from(data, offset)[2]
+            else:
+                raise ValueError(f"corrupt replay record {kind} at byte {offset}")
+        return offset
+
+    def _seek(self, tick):
+        tick = max(0, min(tick, self.ticks))
+        _, offset = self.keyframes[bisect_right(self.keyframe_ticks, tick) - 1]
+        state, offset = self._load_keyframe(offset)
+        return state, self._apply(state, offset, tick)
+
+    def seek(self, tick):
+        # Fresh state at the given tick (clamped to the recording)
+        return self._seek(tick)[0]
+
+    def play(self, start=0):
+        # Yields the state at every tick from start to the end. The same state
+        # object is updated in place between yields
+        state, offset = self._seek(start)
+        yield state
+        while state.tick < self.ticks:
+            offset = self._apply(state, offset, state.tick + 1)
+            yield state
+
+def draw_state(surface, board, state):
+    # One pixel per cell on the board surface, snakes over food, then scaled to the screen
+    board.fill(BG_COLOR)
+    width, height = board.get_size()
+    for x, y in state.foods:
+        if 0 <= x < width and 0 <= y < height:
+            board.set_at((x, y), RED)
+    for snake in state.snakes:
+        for x, y in snake.body:
+            if 0 <= x < width and 0 <= y < height:
+                board.set_at((x, y), GREEN)
+    size = surface.get_size()
+    surface.blit(board if board.get_size() == size else pygame.transform.scale(board, size), (0, 0))
+
+def watch(reader, start=0):
+    # Plays a replay in a window at the recorded pace. Space pauses,
+    # Left/Right jump a keyframe interval back/forward, ESC quits
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("AI Snake Game - Replay")
+    font = pygame.font.SysFont(None, 24)
+    board = pygame.Surface((reader.cols, reader.rows))
+    clock = pygame.time.Clock()
+    frames = reader.play(start)
+    state = next(frames)
+    paused = False
+    elapsed = 0
+    running = True
+    while running:
+        dt = clock.tick(MAX_FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    step = reader.keyframe_interval if event.key == pygame.K_RIGHT else -reader.keyframe_interval
+                    frames = reader.play(state.tick + step)
+                    state = next(frames)
+                    elapsed = 0
+
+        if not paused:
+            # Each tick stays on screen for the game time it covered when recorded
+            elapsed += dt
+            while state.tick < reader.ticks and elapsed >= state.dt:
+                elapsed -= state.dt
+                state = next(frames)
+
+        draw_state(screen, board, state)
+        label = f"Tick {state.tick}/{reader.ticks}" + (" (paused)" if paused else "")
+        screen.blit(font.render(label, True, SLIDER_TEXT_COLOR), (10, 10))
+        pygame.display.flip()
+    pygame.quit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back or inspect a recorded game")
+    parser.add_argument("path", help="replay file written with --record")
+    parser.add_argument("--start", type=int, default=0, help="tick to start playback at")
+    parser.add_argument("--info", action="store_true", help="print a JSON summary instead of playing")
+    args = parser.parse_args()
+
+    with ReplayReader(args.path) as reader:
+        if args.info:
+            state = reader.seek(reader.ticks)
+            print(json.dumps({
+                "seed": reader.seed,
+                "ticks": reader.ticks,
+                "keyframes": len(reader.keyframes),
+                "complete": reader.complete,
+                "snakes": reader.num_snakes,
+                "survivors": sum(snake.alive for snake in state.snakes),
+                "bytes": len(reader.data),
+            }))
+        else:
+            watch(reader, args.start)
+
+if __name__ == '__main__':
+    main()